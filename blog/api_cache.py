@@ -0,0 +1,153 @@
+"""Response cache ของ /api/v1 ที่หมดอายุตามรุ่นของเนื้อหา
+
+frontend Next.js เรียก latest / popular / หมวดหมู่ ซ้ำ ๆ ตลอดเวลา
+ทุก response จึงถูกเก็บใน cache โดยใช้ key ที่ประกอบด้วย
+
+    รุ่นเนื้อหาปัจจุบัน + host + path + query string ที่เรียงแล้ว
+
+รุ่นเนื้อหา (ContentGeneration) ถูกบวกหนึ่งจาก signal (blog/signals.py) ทุกครั้งที่
+Post / Video / Survey / Category / PostType ที่มองเห็นจากหน้าเว็บถูกแก้หรือลบ
+key เก่าทั้งหมดจึงใช้ไม่ได้ทันทีเมื่อมีการเผยแพร่หรือแก้ไข โดยไม่ต้องรอ TTL
+
+API_CACHE_TIMEOUT เป็นแค่เพดาน ให้ยอดเข้าชม (ซึ่งไม่บวกรุ่น) ไม่ค้างนานเกินไป
+
+ทุก response ได้ ETag และ detail view ได้ Last-Modified ด้วย (blog/conditional.py)
+"""
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .conditional import (
+    etag_for_data, is_not_modified, not_modified_response, set_validators,
+    validators_for_instance,
+)
+from .models import ContentGeneration
+
+GENERATION_NAME = 'content'
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def generation_state():
+    """(รุ่นปัจจุบัน, เวลาที่บวกล่าสุดหรือ None) ใน query เดียว"""
+    row = (ContentGeneration.objects.filter(name=GENERATION_NAME)
+           .values_list('value', 'updated_at').first())
+    return row or (0, None)
+
+
+def current_generation():
+    return generation_state()[0]
+
+
+def bump_generation():
+    updated = ContentGeneration.objects.filter(name=GENERATION_NAME).update(
+        value=F('value') + 1, updated_at=timezone.now())
+    if not updated:
+        ContentGeneration.objects.get_or_create(name=GENERATION_NAME, defaults={'value': 1})
+
+
+def normalized_query(request):
+    params = request.GET
+    return '&'.join('%s=%s' % (k, v) for k in sorted(params) for v in sorted(params.getlist(k)))
+
+
+def cache_key(request, generation):
+    # host/scheme อยู่ใน key ด้วยเพราะ URL รูปเป็น absolute (build_absolute_uri)
+    raw = '%s://%s%s?%s' % (request.scheme, request.get_host(), request.path, normalized_query(request))
+    return 'api:%d:%s' % (generation, hashlib.sha1(raw.encode()).hexdigest())
+
+
+def _enabled():
+    return getattr(settings, 'API_CACHE_ENABLED', True)
+
+
+def _timeout():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def cached_data(request, build, generation=None):
+    """คืนข้อมูลจาก cache ถ้ามี ไม่งั้นเรียก build() แล้วเก็บไว้ คืน (data, hit)"""
+    if not _enabled():
+        return build(), False
+    if generation is None:
+        generation = current_generation()
+    key = cache_key(request, generation)
+    data = _cache().get(key)
+    if data is not None:
+        return data, True
+    data = build()
+    _cache().set(key, data, _timeout())
+    return data, False
+
+
+def cached_response(request, build):
+    """เหมือน cached_data แต่ build() คืน Response — เก็บเฉพาะ 200
+
+    ETag ถูกคำนวณครั้งเดียวตอน miss แล้วเก็บไว้คู่กับ body
+    request ที่ revalidate ตอน hit จึงได้ 304 โดยไม่ต้องแตะข้อมูลเลย
+
+    ไม่ส่ง Last-Modified: รายการเปลี่ยนได้โดยไม่มีแถวไหน updated_at ขยับ
+    (เลิกเผยแพร่/ลบแถวล่าสุด, ลำดับ popular, ยอดนับใน category) client ที่ใช้แค่
+    If-Modified-Since จะได้ 304 ค้างรายการเก่า — ETag ครอบคลุมทุกกรณีเหล่านี้
+    """
+    generation = current_generation()
+    key = cache_key(request, generation)
+    entry = _cache().get(key) if _enabled() else None
+    if entry is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        etag = etag_for_data(response.data)
+        if _enabled():
+            _cache().set(key, {'data': response.data, 'etag': etag}, _timeout())
+            response['X-Cache'] = 'MISS'
+    else:
+        etag = entry['etag']
+        response = Response(entry['data'])
+        response['X-Cache'] = 'HIT'
+    if is_not_modified(request, etag, None):
+        return not_modified_response(etag, None)
+    return set_validators(response, etag, None)
+
+
+def detail_response(request, instance, build, record=None):
+    """Response ของ detail view — ตอบ 304 จากค่าใน object ก่อน serialize
+
+    Last-Modified = ค่าที่ใหม่กว่าระหว่าง updated_at ของ object กับเวลาที่บวกรุ่นล่าสุด
+    (เปลี่ยนชื่อ category หรือ tag ไม่ขยับ updated_at ของ object แต่ขยับรุ่น)
+    record: นับการเข้าชม (record_view) — เรียกหลังคำนวณ validator จากยอดในฐานข้อมูล
+    """
+    generation, bumped_at = generation_state()
+    etag, last_modified = validators_for_instance(generation, instance, bumped_at)
+    if record is not None:
+        record(instance)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    data, hit = cached_data(request, build, generation)
+    response = Response(data)
+    if _enabled():
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return set_validators(response, etag, last_modified)
+
+
+def cache_api_response(view):
+    """Decorator สำหรับ function view ของ DRF (วางใต้ @api_view)"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return cached_response(request, lambda: view(request, *args, **kwargs))
+    return wrapper
+
+
+class CachedResponseMixin:
+    """Generic list/retrieve views: cache the whole GET response"""
+
+    def get(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(CachedResponseMixin, self).get(request, *args, **kwargs))
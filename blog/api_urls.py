@@ -1,9 +1,12 @@
 from django.urls import path
-from . import api_views
+from . import api_views, webhooks
 
 app_name = 'api'
 
 urlpatterns = [
+    # Homepage bundle
+    path('home/', api_views.home, name='home'),
+
     # Categories
     path('categories/', api_views.CategoryListView.as_view(), name='category-list'),
     path('categories/<slug:slug>/', api_views.CategoryDetailView.as_view(), name='category-detail'),
@@ -40,4 +43,7 @@ urlpatterns = [
 
     # Surveys by category
     path('categories/<slug:category_slug>/surveys/', api_views.surveys_by_category, name='surveys-by-category'),
+
+    # Facebook page webhook (blog/webhooks.py)
+    path('webhooks/facebook/', webhooks.facebook, name='facebook-webhook'),
 ]
\ No newline at end of file
@@ -1,8 +1,9 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import generics, viewsets
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Post, Category, PostType, Video, Survey
+from .models import LIST_DEFERRED_FIELDS, Post, Category, PostType, Video, Survey
 from .serializers import (
     CategorySerializer,
     PostTypeSerializer,
@@ -14,10 +15,15 @@ from .serializers import (
     SurveyListSerializer,
     SurveyDetailSerializer
 )
+from .api_cache import CachedResponseMixin, cache_api_response, detail_response
+from .fieldsets import SparseQuerysetMixin, requested_fields, sparse_queryset
+from .pagination import KeysetOrLegacyMixin, keyset_page
+from .search import ranked_queryset
+from .view_counter import record_view
 from taggit.models import Tag
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
     """
     API view to list all categories with post counts
     """
@@ -25,7 +31,7 @@ class CategoryListView(generics.ListAPIView):
     serializer_class = CategorySerializer
 
 
-class PostTypeListView(generics.ListAPIView):
+class PostTypeListView(CachedResponseMixin, generics.ListAPIView):
     """
     API view to list all post types with post counts
     """
@@ -33,25 +39,17 @@ class PostTypeListView(generics.ListAPIView):
     serializer_class = PostTypeSerializer
 
 
-class PostListView(generics.ListAPIView):
+class PostListView(CachedResponseMixin, KeysetOrLegacyMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
-    API view to list published posts with pagination
+    API view to list published posts
     Supports search by title, content, and category
+    Cursor pagination with ?paginate=cursor (&order=latest|popular)
     """
     serializer_class = PostListSerializer
-    pagination_class = None  # Disable pagination temporarily for Next.js compatibility
+    legacy_pagination_class = None  # Plain list for Next.js compatibility
     
     def get_queryset(self):
-        queryset = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags')
-        
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(category__name__icontains=search)
-            )
+        queryset = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS)
         
         # Filter by category
         category_slug = self.request.query_params.get('category', None)
@@ -63,6 +61,10 @@ class PostListView(generics.ListAPIView):
         if tag_slug:
             queryset = queryset.filter(tags__slug=tag_slug)
         
+        # Search functionality (ranked by the search index, after the filters above)
+        search = self.request.query_params.get('search', None)
+        if search:
+            return ranked_queryset(queryset, search)
         return queryset.order_by('-created_at')
 
 
@@ -77,15 +79,12 @@ class PostDetailView(generics.RetrieveAPIView):
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Increment view count (buffered, written in batches)
+        return detail_response(request, instance, lambda: self.get_serializer(instance).data,
+                               record=record_view)
 
 
-class CategoryDetailView(generics.RetrieveAPIView):
+class CategoryDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     """
     API view to get category details and its posts
     """
@@ -94,7 +93,7 @@ class CategoryDetailView(generics.RetrieveAPIView):
     lookup_field = 'slug'
 
 
-class TagListView(generics.ListAPIView):
+class TagListView(CachedResponseMixin, generics.ListAPIView):
     """
     API view to list all tags
     """
@@ -103,6 +102,7 @@ class TagListView(generics.ListAPIView):
 
 
 @api_view(['GET'])
+@cache_api_response
 def posts_by_category(request, category_slug):
     """
     API endpoint to get posts by category slug
@@ -112,19 +112,20 @@ def posts_by_category(request, category_slug):
         posts = Post.objects.filter(
             category=category,
             status='published'
-        ).select_related('author', 'category', 'post_type').prefetch_related('tags').order_by('-created_at')
-        
-        serializer = PostListSerializer(posts, many=True, context={'request': request})
+        ).select_related('author', 'category', 'post_type').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS).order_by('-created_at')
         
+        # ใช้ context เดียวกัน ยอดนับของ category จะถูกโหลดครั้งเดียวทั้ง response
+        context = {'request': request}
         return Response({
-            'category': CategorySerializer(category).data,
-            'posts': serializer.data
+            'category': CategorySerializer(category, context=context).data,
+            **keyset_page(request, posts, PostListSerializer, 'posts', context),
         })
     except Category.DoesNotExist:
         return Response({'error': 'Category not found'}, status=404)
 
 
 @api_view(['GET'])
+@cache_api_response
 def posts_by_tag(request, tag_slug):
     """
     API endpoint to get posts by tag slug
@@ -134,60 +135,55 @@ def posts_by_tag(request, tag_slug):
         posts = Post.objects.filter(
             tags=tag,
             status='published'
-        ).select_related('author', 'category', 'post_type').prefetch_related('tags').order_by('-created_at')
-        
-        serializer = PostListSerializer(posts, many=True, context={'request': request})
+        ).select_related('author', 'category', 'post_type').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS).order_by('-created_at')
         
         return Response({
             'tag': TagSerializer(tag).data,
-            'posts': serializer.data
+            **keyset_page(request, posts, PostListSerializer, 'posts'),
         })
     except Tag.DoesNotExist:
         return Response({'error': 'Tag not found'}, status=404)
 
 
 @api_view(['GET'])
+@cache_api_response
 def latest_posts(request):
     """
     API endpoint to get latest published posts
     """
     limit = int(request.query_params.get('limit', 10))
-    posts = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags').order_by('-created_at')[:limit]
-    
+    posts = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS)
+    posts = sparse_queryset(posts, PostListSerializer, request).order_by('-created_at')[:limit]
+
     serializer = PostListSerializer(posts, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@cache_api_response
 def popular_posts(request):
     """
     API endpoint to get most popular posts by view count
     """
     limit = int(request.query_params.get('limit', 10))
-    posts = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags').order_by('-view_count')[:limit]
-    
+    posts = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS)
+    posts = sparse_queryset(posts, PostListSerializer, request).order_by('-view_count')[:limit]
+
     serializer = PostListSerializer(posts, many=True, context={'request': request})
     return Response(serializer.data)
 
-class VideoListView(generics.ListAPIView):
+class VideoListView(CachedResponseMixin, KeysetOrLegacyMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list published videos with pagination
     Supports search by title, description, and category
+    Cursor pagination with ?paginate=cursor (&order=latest|popular)
     """
     serializer_class = VideoListSerializer
+    legacy_pagination_class = PageNumberPagination
     
     def get_queryset(self):
         queryset = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags')
         
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(category__name__icontains=search)
-            )
-        
         # Filter by category
         category_slug = self.request.query_params.get('category', None)
         if category_slug:
@@ -198,6 +194,10 @@ class VideoListView(generics.ListAPIView):
         if tag_slug:
             queryset = queryset.filter(tags__slug=tag_slug)
         
+        # Search functionality (ranked by the search index, after the filters above)
+        search = self.request.query_params.get('search', None)
+        if search:
+            return ranked_queryset(queryset, search)
         return queryset.order_by('-created_at')
 
 
@@ -212,15 +212,13 @@ class VideoDetailView(generics.RetrieveAPIView):
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Increment view count (buffered, written in batches)
+        return detail_response(request, instance, lambda: self.get_serializer(instance).data,
+                               record=record_view)
 
 
 @api_view(['GET'])
+@cache_api_response
 def latest_videos(request):
     """
     API endpoint to get latest published videos
@@ -229,13 +227,15 @@ def latest_videos(request):
     if limit > 50:  # Maximum limit
         limit = 50
     
-    videos = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags').order_by('-created_at')[:limit]
-    
+    videos = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags')
+    videos = sparse_queryset(videos, VideoListSerializer, request).order_by('-created_at')[:limit]
+
     serializer = VideoListSerializer(videos, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@cache_api_response
 def popular_videos(request):
     """
     API endpoint to get most popular videos by view count
@@ -244,13 +244,15 @@ def popular_videos(request):
     if limit > 50:  # Maximum limit
         limit = 50
         
-    videos = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags').order_by('-view_count')[:limit]
-    
+    videos = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags')
+    videos = sparse_queryset(videos, VideoListSerializer, request).order_by('-view_count')[:limit]
+
     serializer = VideoListSerializer(videos, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@cache_api_response
 def videos_by_category(request, category_slug):
     """
     API endpoint to get videos by category slug
@@ -262,17 +264,18 @@ def videos_by_category(request, category_slug):
             status='published'
         ).select_related('author', 'category').prefetch_related('tags').order_by('-created_at')
         
-        serializer = VideoListSerializer(videos, many=True, context={'request': request})
-        
+        # ใช้ context เดียวกัน ยอดนับของ category จะถูกโหลดครั้งเดียวทั้ง response
+        context = {'request': request}
         return Response({
-            'category': CategorySerializer(category).data,
-            'videos': serializer.data
+            'category': CategorySerializer(category, context=context).data,
+            **keyset_page(request, videos, VideoListSerializer, 'videos', context),
         })
     except Category.DoesNotExist:
         return Response({'error': 'Category not found'}, status=404)
 
 
 @api_view(['GET'])
+@cache_api_response
 def videos_by_tag(request, tag_slug):
     """
     API endpoint to get videos by tag slug
@@ -284,41 +287,36 @@ def videos_by_tag(request, tag_slug):
             status='published'
         ).select_related('author', 'category').prefetch_related('tags').order_by('-created_at')
 
-        serializer = VideoListSerializer(videos, many=True, context={'request': request})
-
         return Response({
             'tag': TagSerializer(tag).data,
-            'videos': serializer.data
+            **keyset_page(request, videos, VideoListSerializer, 'videos'),
         })
     except Tag.DoesNotExist:
         return Response({'error': 'Tag not found'}, status=404)
 
 
 # Survey API Views
-class SurveyListView(generics.ListAPIView):
+class SurveyListView(CachedResponseMixin, KeysetOrLegacyMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list published surveys with pagination
     Supports search by title and description
+    Cursor pagination with ?paginate=cursor (&order=latest|popular)
     """
     serializer_class = SurveyListSerializer
+    legacy_pagination_class = PageNumberPagination
 
     def get_queryset(self):
         queryset = Survey.objects.filter(is_published=True).select_related('author', 'category')
 
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(category__name__icontains=search)
-            )
-
         # Filter by category
         category_slug = self.request.query_params.get('category', None)
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
 
+        # Search functionality (ranked by the search index, after the filters above)
+        search = self.request.query_params.get('search', None)
+        if search:
+            return ranked_queryset(queryset, search)
         return queryset.order_by('-created_at')
 
 
@@ -333,15 +331,13 @@ class SurveyDetailView(generics.RetrieveAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Increment view count (buffered, written in batches)
+        return detail_response(request, instance, lambda: self.get_serializer(instance).data,
+                               record=record_view)
 
 
 @api_view(['GET'])
+@cache_api_response
 def latest_surveys(request):
     """
     API endpoint to get latest published surveys
@@ -350,13 +346,15 @@ def latest_surveys(request):
     if limit > 50:  # Maximum limit
         limit = 50
 
-    surveys = Survey.objects.filter(is_published=True).select_related('author', 'category').order_by('-created_at')[:limit]
+    surveys = Survey.objects.filter(is_published=True).select_related('author', 'category')
+    surveys = sparse_queryset(surveys, SurveyListSerializer, request).order_by('-created_at')[:limit]
 
     serializer = SurveyListSerializer(surveys, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@cache_api_response
 def popular_surveys(request):
     """
     API endpoint to get most popular surveys by view count
@@ -365,13 +363,15 @@ def popular_surveys(request):
     if limit > 50:  # Maximum limit
         limit = 50
 
-    surveys = Survey.objects.filter(is_published=True).select_related('author', 'category').order_by('-view_count')[:limit]
+    surveys = Survey.objects.filter(is_published=True).select_related('author', 'category')
+    surveys = sparse_queryset(surveys, SurveyListSerializer, request).order_by('-view_count')[:limit]
 
     serializer = SurveyListSerializer(surveys, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@cache_api_response
 def surveys_by_category(request, category_slug):
     """
     API endpoint to get surveys by category slug
@@ -383,11 +383,49 @@ def surveys_by_category(request, category_slug):
             is_published=True
         ).select_related('author', 'category').order_by('-created_at')
 
-        serializer = SurveyListSerializer(surveys, many=True, context={'request': request})
-
+        # ใช้ context เดียวกัน ยอดนับของ category จะถูกโหลดครั้งเดียวทั้ง response
+        context = {'request': request}
         return Response({
-            'category': CategorySerializer(category).data,
-            'surveys': serializer.data
+            'category': CategorySerializer(category, context=context).data,
+            **keyset_page(request, surveys, SurveyListSerializer, 'surveys', context),
         })
     except Category.DoesNotExist:
         return Response({'error': 'Category not found'}, status=404)
+
+
+@api_view(['GET'])
+@cache_api_response
+def home(request):
+    """
+    API endpoint for the homepage: latest posts, videos and surveys, popular
+    posts and categories in a single response (one round trip, one cache entry)
+    """
+    limit = int(request.query_params.get('limit', 10))
+    if limit > 50:  # Maximum limit
+        limit = 50
+
+    # context เดียวทั้ง response: ยอดนับและแถวของ category / post type โหลดครั้งเดียว
+    context = {'request': request}
+
+    posts = Post.objects.filter(status='published').select_related('author', 'category', 'post_type').defer(*LIST_DEFERRED_FIELDS)
+    posts = sparse_queryset(posts, PostListSerializer, request).prefetch_related(None)
+    latest = list(posts.order_by('-created_at')[:limit])
+    # โพสต์ที่อยู่ทั้งสองส่วนใช้ instance เดียวกัน tags จึง prefetch ครั้งเดียว
+    by_pk = {post.pk: post for post in latest}
+    popular = [by_pk.setdefault(post.pk, post) for post in posts.order_by('-view_count')[:limit]]
+    selected = requested_fields(request, PostListSerializer.Meta.fields)
+    if selected is None or 'tags' in selected:
+        prefetch_related_objects(list(by_pk.values()), 'tags')
+
+    videos = Video.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags')
+    videos = sparse_queryset(videos, VideoListSerializer, request).order_by('-created_at')[:limit]
+    surveys = Survey.objects.filter(is_published=True).select_related('author', 'category')
+    surveys = sparse_queryset(surveys, SurveyListSerializer, request).order_by('-created_at')[:limit]
+
+    return Response({
+        'latest_posts': PostListSerializer(latest, many=True, context=context).data,
+        'popular_posts': PostListSerializer(popular, many=True, context=context).data,
+        'latest_videos': VideoListSerializer(videos, many=True, context=context).data,
+        'latest_surveys': SurveyListSerializer(surveys, many=True, context=context).data,
+        'categories': CategorySerializer(Category.objects.order_by('name'), many=True, context=context).data,
+    })
@@ -0,0 +1,184 @@
+"""ตัวจัด Category ให้โพสต์ที่นำเข้า — เรียนจาก Post/Video ที่คนจัดหมวดไว้แล้ว
+
+แทนการไล่ CATEGORY_KEYWORDS ทีละคำด้วย str.count() ทุกโพสต์ ซึ่งต้องคอยเติมคำเอง
+
+- feature: character n-gram (2-4 ตัวอักษร) เหมาะกับภาษาไทยที่ไม่เว้นวรรคระหว่างคำ
+  น้ำหนัก log(1+tf) * idf แล้ว normalize ความยาวเป็น 1 (โพสต์ยาวไม่ได้เปรียบ)
+- model: multinomial Naive Bayes บน feature ข้างบน — เทรนแค่รวมน้ำหนักต่อหมวด
+  ให้คะแนนทั้งหน้าของ Graph ด้วย matrix multiply ครั้งเดียว
+- confidence คือความน่าจะเป็นของหมวดที่ชนะ ต่ำกว่า threshold คืน None
+  ให้ผู้เรียกใช้ FALLBACK_CATEGORY เอง (ไม่เดามั่ว)
+
+บันทึกเป็นไฟล์ .npz บีบอัด (settings.CATEGORY_MODEL_PATH) ไม่มี pickle
+
+    python manage.py train_category_classifier
+    python manage.py evaluate_category_classifier
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.utils.html import strip_tags
+
+NGRAM_RANGE = (2, 4)
+MAX_FEATURES = 20000
+MIN_DF = 2
+ALPHA = 0.1  # Laplace smoothing
+DEFAULT_THRESHOLD = 0.7
+FORMAT_VERSION = 1
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(text):
+    text = strip_tags(text or "").lower()
+    return _WS.sub(" ", text).strip()
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    text = normalize(text)
+    lo, hi = ngram_range
+    grams = Counter()
+    for n in range(lo, hi + 1):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram.strip():
+                grams[gram] += 1
+    return grams
+
+
+class CategoryClassifier:
+    def __init__(self, classes, vocab, idf, log_prob, log_prior,
+                 ngram_range=NGRAM_RANGE, threshold=DEFAULT_THRESHOLD):
+        self.classes = list(classes)
+        self.vocab = list(vocab)
+        self.index = {g: i for i, g in enumerate(self.vocab)}
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.log_prob = np.asarray(log_prob, dtype=np.float32)  # (หมวด, feature)
+        self.log_prior = np.asarray(log_prior, dtype=np.float32)
+        self.ngram_range = tuple(ngram_range)
+        self.threshold = threshold
+
+    # ---- feature ----
+
+    def transform(self, texts):
+        """matrix (len(texts), feature) — n-gram ที่ไม่อยู่ใน vocab ถูกทิ้ง"""
+        X = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            grams = char_ngrams(text, self.ngram_range)
+            cols = [self.index[g] for g in grams if g in self.index]
+            if cols:
+                X[row, cols] = np.log1p([grams[self.vocab[c]] for c in cols])
+        X *= self.idf
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        np.divide(X, norms, out=X, where=norms > 0)
+        return X
+
+    # ---- ทำนาย ----
+
+    def predict_proba(self, texts):
+        if not len(texts):
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        scores = self.transform(texts) @ self.log_prob.T + self.log_prior
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts, threshold=None):
+        """[(ชื่อหมวด หรือ None, confidence), ...] ตามลำดับ texts"""
+        threshold = self.threshold if threshold is None else threshold
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1) if len(proba) else []
+        out = []
+        for row, col in enumerate(best):
+            confidence = float(proba[row, col])
+            out.append((self.classes[col] if confidence >= threshold else None, confidence))
+        return out
+
+    # ---- เทรน ----
+
+    @classmethod
+    def train(cls, texts, labels, ngram_range=NGRAM_RANGE, max_features=MAX_FEATURES,
+              min_df=MIN_DF, alpha=ALPHA, threshold=DEFAULT_THRESHOLD):
+        if not texts:
+            raise ValueError("ไม่มีข้อมูลสำหรับเทรน")
+        docs = [char_ngrams(t, ngram_range) for t in texts]
+        df = Counter(g for d in docs for g in d)
+        vocab = [g for g, n in df.most_common(max_features) if n >= min_df]
+        vocab.sort()
+        n_docs = len(docs)
+        idf = np.log((1 + n_docs) / (1 + np.array([df[g] for g in vocab], dtype=np.float64))) + 1
+
+        classes = sorted(set(labels))
+        model = cls(classes, vocab, idf, np.zeros((len(classes), len(vocab))),
+                    np.zeros(len(classes)), ngram_range, threshold)
+        # รวมน้ำหนัก feature ต่อหมวดทีละก้อน ไม่ต้องถือ matrix ของทุกเอกสารพร้อมกัน
+        totals = np.zeros((len(classes), len(vocab)), dtype=np.float64)
+        label_index = np.array([classes.index(label) for label in labels])
+        for start in range(0, n_docs, 512):
+            X = model.transform(texts[start:start + 512])
+            np.add.at(totals, label_index[start:start + 512], X)
+        totals += alpha
+        model.log_prob = np.log(totals / totals.sum(axis=1, keepdims=True)).astype(np.float32)
+        counts = np.bincount(label_index, minlength=len(classes))
+        model.log_prior = np.log(counts / counts.sum()).astype(np.float32)
+        return model
+
+    # ---- ไฟล์ ----
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.array(FORMAT_VERSION),
+                classes=np.array(self.classes, dtype=str),
+                vocab=np.array(self.vocab, dtype=str),
+                idf=self.idf,
+                log_prob=self.log_prob.astype(np.float16),
+                log_prior=self.log_prior,
+                ngram_range=np.array(self.ngram_range),
+                threshold=np.array(self.threshold),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError("ไฟล์ model รุ่นไม่ตรง เทรนใหม่ด้วย train_category_classifier")
+            return cls(data["classes"].tolist(), data["vocab"].tolist(), data["idf"],
+                       data["log_prob"], data["log_prior"], data["ngram_range"].tolist(),
+                       float(data["threshold"]))
+
+
+def model_path():
+    return getattr(settings, "CATEGORY_MODEL_PATH", None)
+
+
+def load_default():
+    """model จาก settings.CATEGORY_MODEL_PATH หรือ None ถ้ายังไม่เคยเทรน"""
+    path = model_path()
+    try:
+        return CategoryClassifier.load(path) if path else None
+    except FileNotFoundError:
+        return None
+
+
+def labelled_examples(exclude=()):
+    """(ข้อความ, ชื่อหมวด, key) ของ Post/Video ที่มีหมวดแล้ว — key คือ "post:<id>" / "video:<id>" """
+    from .models import Post, Video
+
+    rows = []
+    posts = (Post.objects.filter(category__isnull=False)
+             .exclude(category__name__in=exclude)
+             .values_list("id", "title", "plain_text", "content", "category__name"))
+    for pk, title, plain, content, cat in posts.iterator():
+        rows.append(("%s\n%s" % (title, plain or strip_tags(content)), cat, "post:%d" % pk))
+    videos = (Video.objects.filter(category__isnull=False)
+              .exclude(category__name__in=exclude)
+              .values_list("id", "title", "description", "category__name"))
+    for pk, title, description, cat in videos.iterator():
+        rows.append(("%s\n%s" % (title, strip_tags(description)), cat, "video:%d" % pk))
+    return rows
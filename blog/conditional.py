@@ -0,0 +1,89 @@
+"""ETag / Last-Modified สำหรับ API (conditional GET)
+
+Next.js และเบราว์เซอร์ revalidate ทุก response ด้วย If-None-Match / If-Modified-Since
+ถ้าเนื้อหาไม่เปลี่ยนเราตอบ 304 ก่อนจะ serialize อะไรเลย
+
+list / bundle: strong ETag = hash ของ body ที่ serialize แล้วทั้งก้อน คำนวณตอน cache miss
+แล้วเก็บไว้คู่กับ body ใน cache (blog/api_cache.py) — ตอน hit จึงไม่มีต้นทุนเพิ่ม
+ครอบคลุมทุกอย่างที่อยู่ใน body (ยอดวิว, ลำดับ, ?fields=) ไม่ต้องพึ่งว่ามี id / updated_at
+
+detail: weak ETag จาก object ที่โหลดมาแล้ว ตอบ 304 ได้ก่อน serialize
+  - API_SERIALIZER_VERSION (บวกเมื่อรูปแบบ JSON เปลี่ยน)
+  - รุ่นเนื้อหา (ContentGeneration) — ครอบคลุมชื่อ / ยอดนับของ category ที่ฝังอยู่
+  - id, updated_at และ view_count ตามที่อ่านจากฐานข้อมูล
+เป็น weak เพราะ body บวกยอดวิวที่ยังค้างใน worker (blog/view_counter.py) ไว้ด้วย
+ยอดที่ยังไม่ได้เขียนจึงไม่เปลี่ยน ETag — เปลี่ยนเมื่อเขียนลงฐานข้อมูลแล้ว
+
+Last-Modified มีเฉพาะ detail view = max(updated_at ของ object, เวลาที่บวกรุ่นล่าสุด)
+list / bundle ไม่มี เพราะรายการเปลี่ยนได้โดยไม่มี updated_at ไหนขยับ
+(เลิกเผยแพร่แถวล่าสุด, ลำดับ popular) If-Modified-Since อย่างเดียวจะได้ 304 ผิด ๆ
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .serializers import API_SERIALIZER_VERSION
+
+def etag_for_data(data):
+    """strong ETag ของ body — data ของ response ก่อน render"""
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), sort_keys=True)
+    h = hashlib.sha1(('v%s:' % API_SERIALIZER_VERSION).encode())
+    h.update(body.encode())
+    return '"%s"' % h.hexdigest()
+
+
+def last_modified_of(rows):
+    """timestamp (วินาที) ของ updated_at ล่าสุด หรือ None"""
+    latest = None
+    for _, updated in rows:
+        if isinstance(updated, str):
+            updated = parse_datetime(updated) if updated else None
+        if updated is not None and (latest is None or updated > latest):
+            latest = updated
+    return int(latest.timestamp()) if latest else None
+
+
+def validators_for_instance(generation, instance, generation_changed=None):
+    """(weak ETag, Last-Modified) ของ object ที่โหลดมาแล้ว — เรียกก่อนนับการเข้าชมครั้งนี้
+
+    generation_changed: เวลาที่บวกรุ่นล่าสุด (datetime หรือ None)
+    """
+    raw = 'v%s:g%s|%s@%s|%s' % (API_SERIALIZER_VERSION, generation, instance.pk,
+                                instance.updated_at.isoformat(), instance.view_count)
+    etag = 'W/"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+    rows = [(instance.pk, instance.updated_at), (None, generation_changed)]
+    return etag, last_modified_of(rows)
+
+
+def is_not_modified(request, etag, last_modified):
+    """ตาม RFC 9110: มี If-None-Match ให้ดูแค่นั้น ไม่สน If-Modified-Since (เทียบแบบ weak)"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or _opaque(etag) in [_opaque(t) for t in tags]
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since and last_modified is not None:
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and last_modified <= since
+    return False
+
+
+def _opaque(etag):
+    return etag.removeprefix('W/').strip('"')
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
@@ -0,0 +1,96 @@
+"""Sparse fieldsets: ?fields= / ?omit= บน serializer ของ Post / Video / Survey
+
+การ์ดเล็ก ๆ ในหน้าแรกต้องการแค่ title, slug กับรูป แต่ list serializer ส่ง category
+พร้อมยอดนับ, post type, tags, author มาทุกครั้ง
+
+    /api/v1/posts/latest/?fields=id,title,slug,featured_image_url
+    /api/v1/videos/?omit=tags,category
+
+field ที่ไม่ได้ขอจะถูกตัดออกจาก serializer และ queryset ถูกลดลงตาม
+(.only() เฉพาะคอลัมน์ที่ใช้, select_related / prefetch_related เฉพาะ relation ที่ใช้)
+ชื่อ field ที่ไม่รู้จักถูกข้ามไปเฉย ๆ ไม่มี ?fields / ?omit = ได้ response เดิมทุกอย่าง
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+# คอลัมน์ที่โหลดเสมอ — pagination แบบ keyset อ่านค่าเหล่านี้จากแถวสุดท้าย
+ALWAYS_LOADED = ('id', 'created_at', 'view_count')
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def requested_fields(request, available):
+    """list ของ field ที่จะส่งตามลำดับเดิม หรือ None ถ้าไม่ได้ขอ projection"""
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields, omit = _names(params.get(FIELDS_PARAM)), _names(params.get(OMIT_PARAM))
+    if not fields and not omit:
+        return None
+    selected = [name for name in available if not fields or name in fields]
+    return [name for name in selected if name not in omit]
+
+
+class SparseFieldsetMixin:
+    """ตัด field ของ serializer ตาม ?fields= / ?omit= ของ request ใน context
+
+    ``field_sources`` บอกว่า field ที่ไม่ใช่คอลัมน์ตรง ๆ ต้องใช้ model field ไหน
+    (ค่าเริ่มต้นคือชื่อเดียวกัน) ใช้คำนวณ queryset ใน sparse_queryset()
+    """
+    field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = requested_fields(self.context.get('request'), list(self.fields))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+def sparse_queryset(queryset, serializer_class, request):
+    """ลด queryset ให้โหลดเฉพาะสิ่งที่ field ที่ขอใช้ — ไม่มี projection คืน queryset เดิม"""
+    selected = requested_fields(request, serializer_class.Meta.fields)
+    if selected is None:
+        return queryset
+    opts = queryset.model._meta
+    columns = {name for name in ALWAYS_LOADED if _has_field(opts, name)}
+    select, prefetch = set(), set()
+    for name in selected:
+        for source in serializer_class.field_sources.get(name, (name,)):
+            if not _has_field(opts, source):
+                continue
+            field = opts.get_field(source)
+            if field.many_to_many or field.one_to_many:
+                prefetch.add(source)
+                continue
+            columns.add(source)
+            if field.many_to_one or field.one_to_one:
+                select.add(source)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+    return queryset.only(*sorted(columns))
+
+
+def _has_field(opts, name):
+    try:
+        opts.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+class SparseQuerysetMixin:
+    """Generic list views: ลด queryset ตาม ?fields= / ?omit= หลังกรองแล้ว"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return sparse_queryset(queryset, self.get_serializer_class(), self.request)
@@ -0,0 +1,178 @@
+"""HTTP client สำหรับ Facebook Graph API
+
+ใช้ร่วมกันระหว่างตัวนำเข้า (import_facebook_posts) และงานอื่นที่คุยกับ Graph
+
+- httpx.Client ตัวเดียว: connection pool + keep-alive ไม่ต้อง TLS handshake ใหม่ทุกหน้า
+- retry เมื่อเน็ตสะดุด, 429/5xx หรือ Graph บอกว่าเป็น error ชั่วคราว
+  รอแบบ exponential backoff + full jitter (สุ่ม 0..base*2^n) กันหลาย process ยิงพร้อมกัน
+- อ่าน header x-app-usage / x-page-usage / x-business-use-case-usage หลังทุก request
+  ใช้เกิน SLOWDOWN_AT% แล้วค่อย ๆ เว้นระยะมากขึ้น ถ้า Graph บอกเวลาที่จะได้สิทธิ์คืน
+  (estimated_time_to_regain_access) ก็หยุดรอตามนั้น แทนที่จะยิงจนโดนบล็อก
+- เก็บสถิติ: จำนวน request, retry, เวลาที่รอเพราะ throttle, latency p50/p95
+
+    client = GraphClient()
+    data = client.get("<page id>/posts", {"fields": "id", "access_token": token})
+    data = client.get(data["paging"]["next"])   # URL เต็มก็ได้
+"""
+
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from django.conf import settings
+
+GRAPH_URL = "https://graph.facebook.com/v21.0/"
+USER_AGENT = "civicblogs-import"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# error code ของ Graph ที่หมายถึงโดนจำกัดอัตรา (app / user / page / custom)
+THROTTLE_CODES = {4, 17, 32, 613}
+
+# ใช้โควต้าเกินเท่านี้ (%) แล้วเริ่มเว้นระยะ — ถึง 100% เว้น MAX_PACING วินาทีต่อ request
+SLOWDOWN_AT = 60
+MAX_PACING = 10.0
+USAGE_HEADERS = ("x-app-usage", "x-page-usage", "x-business-use-case-usage")
+
+
+class GraphError(Exception):
+    def __init__(self, message, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def parse_usage(headers):
+    """(เปอร์เซ็นต์สูงสุดจาก usage header ทั้งหมด, วินาทีที่ต้องรอจนได้สิทธิ์คืน)"""
+    highest, regain = 0.0, 0.0
+    for name in USAGE_HEADERS:
+        raw = headers.get(name)
+        if not raw:
+            continue
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            continue
+        # x-business-use-case-usage: {"<business id>": [{...}, ...]}
+        entries = [value] if name != "x-business-use-case-usage" else [
+            e for items in value.values() for e in (items or [])]
+        for entry in entries:
+            for key in ("call_count", "total_cputime", "total_time"):
+                try:
+                    highest = max(highest, float(entry.get(key) or 0))
+                except (TypeError, ValueError):
+                    pass
+            minutes = entry.get("estimated_time_to_regain_access") or 0
+            regain = max(regain, float(minutes) * 60)
+    return highest, regain
+
+
+class GraphClient:
+    def __init__(self, base_url=None, timeout=60, max_retries=5, backoff=1.0,
+                 max_backoff=60.0, transport=None, sleep=time.sleep):
+        self.base_url = base_url or getattr(settings, "FACEBOOK_GRAPH_URL", GRAPH_URL)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.client = httpx.Client(
+            timeout=timeout,
+            transport=transport,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
+        self._lock = threading.Lock()
+        self._not_before = 0.0
+        self.requests = self.retries = self.failures = 0
+        self.throttled = 0.0
+        self.usage = 0.0
+        # latency ล่าสุดเท่านั้น — daemon ที่รันนาน ๆ ไม่กินหน่วยความจำเพิ่มเรื่อย ๆ
+        self.latencies = deque(maxlen=5000)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.client.close()
+
+    def url(self, path_or_url):
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return self.base_url + path_or_url.lstrip("/")
+
+    def get(self, path_or_url, params=None):
+        """JSON ของ response — ยก GraphError เมื่อ retry ครบแล้วยังไม่สำเร็จ"""
+        url = self.url(path_or_url)
+        attempt = 0
+        while True:
+            self._pace()
+            started = time.monotonic()
+            try:
+                r = self.client.get(url, params=params)
+            except httpx.TransportError as e:
+                error = GraphError("เชื่อมต่อ Graph ไม่สำเร็จ: %s" % e)
+                retry = True
+            else:
+                self._record(time.monotonic() - started, r.headers)
+                if r.status_code == 200:
+                    return r.json()
+                error, retry = self._error(r)
+            if not retry or attempt >= self.max_retries:
+                with self._lock:
+                    self.failures += 1
+                raise error
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            self.sleep(self._backoff(attempt))
+
+    def _error(self, r):
+        try:
+            body = r.json().get("error") or {}
+        except ValueError:
+            body = {"message": r.text[:250]}
+        code = body.get("code")
+        retry = (r.status_code in RETRY_STATUS or bool(body.get("is_transient"))
+                 or code in THROTTLE_CODES)
+        return GraphError(body.get("message") or "HTTP %d" % r.status_code,
+                          status=r.status_code, code=code), retry
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _record(self, latency, headers):
+        usage, regain = parse_usage(headers)
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.usage = usage
+            delay = regain
+            if usage > SLOWDOWN_AT:
+                delay = max(delay, MAX_PACING * min(1.0, (usage - SLOWDOWN_AT) / (100 - SLOWDOWN_AT)))
+            if delay:
+                self._not_before = max(self._not_before, time.monotonic() + delay)
+
+    def _pace(self):
+        with self._lock:
+            wait = self._not_before - time.monotonic()
+        if wait > 0:
+            with self._lock:
+                self.throttled += wait
+            self.sleep(wait)
+
+    def summary(self):
+        with self._lock:
+            lat = sorted(self.latencies)
+        if not lat:
+            return "Graph: ยังไม่มี request"
+        p50 = lat[len(lat) // 2]
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        return ("Graph: %d request (retry %d, ล้มเหลว %d) | latency p50 %.2fs p95 %.2fs"
+                " | รอเพราะโควต้า %.1fs | usage ล่าสุด %.0f%%" % (
+                    self.requests, self.retries, self.failures, p50, p95,
+                    self.throttled, self.usage))
@@ -0,0 +1,236 @@
+"""Graph API จำลองในเครื่อง สำหรับทดสอบและวัดความเร็วตัวนำเข้า (import_facebook_posts)
+
+เสิร์ฟ response รูปแบบเดียวกับ Graph จริงเท่าที่ตัวนำเข้าใช้
+  GET /v21.0/<page id>/posts   data + paging.next (after=offset), fields, limit, since, until
+  GET /v21.0/?ids=a,b          {id: โพสต์} ตาม fields — id ที่ไม่มีทำให้ทั้ง request ได้ error 100
+  GET /images/<n>.jpg          รูป JPEG ของ full_picture
+
+ปรับได้: จำนวนโพสต์, latency ของ Graph / รูป, อัตรา error ที่สุ่มใส่ (500 is_transient)
+และ x-app-usage ที่จะส่งกลับ ใช้กับ
+
+    with GraphFixture(posts=300, latency=0.05, error_rate=0.1) as fb:
+        with override_settings(FACEBOOK_GRAPH_URL=fb.graph_url):
+            call_command("import_facebook_posts", ...)
+
+benchmark อยู่ใน blog/tests.py (ImporterBenchmark) — รันด้วย IMPORT_BENCHMARK=1
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+VERSION = "v21.0"
+PAGE_ID = "1000"
+NEWEST = datetime(2026, 3, 31, 12, 0, tzinfo=dt_timezone.utc)
+
+# ข้อความตัวอย่างครอบคลุมกรณีที่ตัวนำเข้าต้องจัดการ: ตรงประเด็น, ไม่ตรงประเด็น,
+# ขึ้นต้นด้วยคำพูด, ไม่มีข้อความเลย
+MESSAGES = [
+    "สงกรานต์ปลอดภัย ด่านชุมชนร่วมกันลดอุบัติเหตุ\n\nชวนทุกคนเมาไม่ขับช่วง 7 วันอันตราย",
+    "ยี่เป็งเชียงใหม่ปีนี้ลอยโคมอย่างปลอดภัย\nติดตามรายละเอียดได้ที่เพจ",
+    "งานช้างสุรินทร์ กับชีวิตควาญช้างรุ่นใหม่",
+    "“เด็กสมัยนี้ไม่อดทน” จริงหรือ? ฟังเสียงเยาวชนร้อยเอ็ด",
+    "บรรยากาศเวทีเสวนาประจำเดือน ขอบคุณทุกคนที่มาร่วมงาน",
+    "",
+]
+MEDIA_TYPES = ["photo", "video", "link", "album", "photo", "photo"]
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), dt_timezone.utc)
+    return datetime.strptime(value[:10], "%Y-%m-%d").replace(tzinfo=dt_timezone.utc)
+
+
+def _image_bytes(size):
+    # noise บีบอัดได้น้อย ขนาดไฟล์จึงใกล้รูปถ่ายจริงกว่าสีพื้น
+    img = Image.frombytes("RGB", size, random.Random(0).randbytes(size[0] * size[1] * 3))
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+class GraphFixture:
+    def __init__(self, posts=100, page_id=PAGE_ID, latency=0.0, image_latency=0.0,
+                 error_rate=0.0, image_error_rate=0.0, usage=None, image_size=(320, 180), seed=0):
+        self.page_id = page_id
+        self.latency = latency
+        self.image_latency = image_latency
+        self.error_rate = error_rate
+        self.image_error_rate = image_error_rate
+        self.usage = usage
+        self.random = random.Random(seed)
+        self.image = _image_bytes(image_size)
+        self.posts = [self._post(n, posts) for n in range(posts)]  # ใหม่ -> เก่า
+        self.requests = {"graph": 0, "images": 0, "graph_errors": 0, "image_errors": 0}
+        self._lock = threading.Lock()
+        self.server = None
+
+    def _post(self, n, total):
+        number = total - n
+        post = {
+            "id": "%s_%d" % (self.page_id, number),
+            "created_time": (NEWEST - timedelta(hours=n)).strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            "status_type": "added_photos",
+            "permalink_url": "https://www.facebook.com/%s/posts/%d" % (self.page_id, number),
+            "attachments": {"data": [{"media_type": MEDIA_TYPES[n % len(MEDIA_TYPES)], "type": "photo"}]},
+        }
+        message = MESSAGES[n % len(MESSAGES)]
+        if message:
+            post["message"] = "%s #%d" % (message, number)
+        if n % 7:
+            post["full_picture"] = "{base}/images/%d.jpg" % number
+        return post
+
+    # ---- lifecycle ----
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"fixture": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    @property
+    def graph_url(self):
+        return "%s/%s/" % (self.base_url, VERSION)
+
+    # ---- responses ----
+
+    def _fail(self, rate, counter):
+        with self._lock:
+            failed = rate and self.random.random() < rate
+            if failed:
+                self.requests[counter] += 1
+        return failed
+
+    def page(self, query):
+        since, until = _timestamp(query.get("since")), _timestamp(query.get("until"))
+        rows = self.posts
+        if since or until:
+            rows = [p for p in rows
+                    if (not since or _timestamp_of(p) >= since) and (not until or _timestamp_of(p) <= until)]
+        limit = int(query.get("limit") or 25)
+        offset = int(query.get("after") or 0)
+        fields = _top_level_fields(query.get("fields") or "id")
+        base = self.base_url
+        data = []
+        for post in rows[offset:offset + limit]:
+            row = {k: v for k, v in post.items() if k in fields or k == "id"}
+            if "full_picture" in row:
+                row["full_picture"] = row["full_picture"].format(base=base)
+            data.append(row)
+        body = {"data": data, "paging": {"cursors": {"before": str(offset), "after": str(offset + limit)}}}
+        if offset + limit < len(rows):
+            query = dict(query, after=str(offset + limit))
+            body["paging"]["next"] = "%s%s/posts?%s" % (self.graph_url, self.page_id,
+                                                         urllib.parse.urlencode(query))
+        return body
+
+    def lookup(self, query):
+        """{id: โพสต์} ของ ?ids= — None ถ้ามี id ที่ไม่มีอยู่ (Graph จริงตอบ error ทั้ง request)"""
+        by_id = {p["id"]: p for p in self.posts}
+        ids = [i for i in (query.get("ids") or "").split(",") if i]
+        if not ids or any(i not in by_id for i in ids):
+            return None
+        fields = _top_level_fields(query.get("fields") or "id")
+        base = self.base_url
+        body = {}
+        for i in ids:
+            row = {k: v for k, v in by_id[i].items() if k in fields or k == "id"}
+            if "full_picture" in row:
+                row["full_picture"] = row["full_picture"].format(base=base)
+            body[i] = row
+        return body
+
+
+def _timestamp_of(post):
+    return datetime.strptime(post["created_time"], "%Y-%m-%dT%H:%M:%S%z")
+
+
+def _top_level_fields(fields):
+    """"id,message,attachments{media_type,type}" -> {"id", "message", "attachments"}"""
+    return set(re.sub(r"\{[^}]*\}", "", fields).split(","))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive ให้ client ใช้ connection ซ้ำได้
+    fixture = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fx = self.fixture
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+
+        if parts.path.startswith("/images/"):
+            with fx._lock:
+                fx.requests["images"] += 1
+            time.sleep(fx.image_latency)
+            if fx._fail(fx.image_error_rate, "image_errors"):
+                return self._send(503, b"unavailable", "text/plain")
+            return self._send(200, fx.image, "image/jpeg")
+
+        if parts.path == "/%s/%s/posts" % (VERSION, fx.page_id):
+            with fx._lock:
+                fx.requests["graph"] += 1
+            time.sleep(fx.latency)
+            if fx._fail(fx.error_rate, "graph_errors"):
+                return self._send(500, {"error": {"message": "injected error", "code": 2,
+                                                  "is_transient": True}})
+            headers = {}
+            if fx.usage is not None:
+                headers["x-app-usage"] = json.dumps(
+                    {"call_count": fx.usage, "total_cputime": 1, "total_time": 1})
+            return self._send(200, fx.page(query), headers=headers)
+
+        if parts.path == "/%s/" % VERSION and "ids" in query:
+            with fx._lock:
+                fx.requests["graph"] += 1
+            time.sleep(fx.latency)
+            body = fx.lookup(query)
+            if body is None:
+                return self._send(400, {"error": {"message": "Some of the aliases you requested do not exist",
+                                                  "code": 100}})
+            return self._send(200, body)
+
+        self._send(404, {"error": {"message": "Unknown path %s" % parts.path, "code": 803}})
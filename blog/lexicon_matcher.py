@@ -0,0 +1,127 @@
+"""จับคำจากพจนานุกรมหลายคำพร้อมกันในรอบเดียว (Aho–Corasick)
+
+ใช้กับพจนานุกรมความรู้สึกของ ThaiSentimentAnalyzer (blog/sentiment_service.py)
+แทนการไล่ทุกคำด้วย ``word in text`` แล้ว ``text.count(word)`` ซึ่งอ่านข้อความซ้ำ
+สองรอบต่อคำ และนับคำที่ซ้อนกันซ้ำ (``ไม่`` ใน ``ไม่ดี`` ถูกนับเป็นลบสองครั้ง)
+
+- สร้าง automaton ครั้งเดียวต่อพจนานุกรม เพิ่มคำด้วย add() แล้วสร้างใหม่ครั้งเดียว
+  ตอนสแกนครั้งถัดไป ไม่ใช่ทุกครั้งที่เรียก
+- เลือกแบบ leftmost-longest: ตำแหน่งซ้ายสุดก่อน ถ้าเริ่มตรงกันเอาคำที่ยาวที่สุด
+  คำที่ถูกเลือกแล้วไม่ซ้อนกัน
+- คำหนึ่งมีได้หลายป้าย (label) — นับให้ทุกป้าย
+
+    matcher = LexiconMatcher({"positive": ["ดี", "ดีมาก"], "negative": ["ไม่", "ไม่ดี"]})
+    matcher.counts("ไม่ดี แต่ก็ดีมาก")   # Counter({"negative": 1, "positive": 1})
+"""
+
+import hashlib
+from collections import Counter, deque
+
+
+class LexiconMatcher:
+    def __init__(self, lexicon=None):
+        self.patterns = {}  # คำ -> tuple ของป้าย
+        self.version = 0
+        self._built = None
+        self._fingerprint = None
+        for label, words in (lexicon or {}).items():
+            self.add(words, label)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __contains__(self, word):
+        return word.lower() in self.patterns
+
+    def add(self, words, label):
+        """เพิ่มคำเข้าป้าย label — automaton สร้างใหม่ตอนสแกนครั้งถัดไป"""
+        changed = False
+        for word in words:
+            word = (word or "").lower()
+            labels = self.patterns.get(word, ())
+            if word and label not in labels:
+                self.patterns[word] = labels + (label,)
+                changed = True
+        if changed:
+            self.version += 1
+            self._built = self._fingerprint = None
+        return self
+
+    @property
+    def fingerprint(self):
+        """hash ของคำและป้ายทั้งหมด — เท่ากันทุก process ถ้าพจนานุกรมเหมือนกัน (ใช้เป็น cache key)"""
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=8)
+            for word in sorted(self.patterns):
+                h.update(("%s\t%s\n" % (word, ",".join(sorted(self.patterns[word])))).encode())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    # ---- automaton ----
+
+    def _build(self):
+        goto, fail, out = [{}], [0], [None]
+        for word, labels in self.patterns.items():
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append(None)
+                state = nxt
+            out[state] = (len(word), labels)
+
+        # out_link: state ถัดไปตามสาย fail ที่จบคำ — ไล่คำที่สั้นกว่าซึ่งจบตำแหน่งเดียวกัน
+        out_link = [0] * len(goto)
+        todo = deque(goto[0].values())
+        while todo:
+            state = todo.popleft()
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out_link[nxt] = fail[nxt] if out[fail[nxt]] else out_link[fail[nxt]]
+                todo.append(nxt)
+        self._built = (goto, fail, out, out_link)
+        return self._built
+
+    def _all_matches(self, text):
+        goto, fail, out, out_link = self._built or self._build()
+        found, state = [], 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = state if out[state] else out_link[state]
+            while hit:
+                length, labels = out[hit]
+                found.append((end - length, end, labels))
+                hit = out_link[hit]
+        return found
+
+    # ---- ใช้งาน ----
+
+    def matches(self, text):
+        """[(start, end, labels), ...] แบบ leftmost-longest ไม่ซ้อนกัน เรียงตามตำแหน่ง
+
+        text ควรเป็นตัวพิมพ์เล็กแล้ว (คำในพจนานุกรมถูกแปลงตอน add())
+        """
+        if not text or not self.patterns:
+            return []
+        chosen, cursor = [], 0
+        for start, end, labels in sorted(self._all_matches(text), key=lambda m: (m[0], -m[1])):
+            if start >= cursor:
+                chosen.append((start, end, labels))
+                cursor = end
+        return chosen
+
+    def counts(self, text):
+        """Counter ของจำนวนคำที่เจอต่อป้าย"""
+        counts = Counter()
+        for _, _, labels in self.matches(text):
+            counts.update(labels)
+        return counts
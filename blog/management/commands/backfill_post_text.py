@@ -0,0 +1,40 @@
+"""คำนวณ excerpt / plain_text / reading_time ของโพสต์ที่มีอยู่แล้ว
+
+    python manage.py backfill_post_text            # เฉพาะโพสต์ที่ยังไม่เคยคำนวณ
+    python manage.py backfill_post_text --all      # คำนวณใหม่ทั้งหมด
+
+โพสต์ใหม่หรือโพสต์ที่แก้ content จะคำนวณเองตอนบันทึก (Post.refresh_derived_text)
+คำสั่งนี้ใช้ครั้งเดียวหลัง migrate หรือเมื่อเปลี่ยนสูตรคำนวณ
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.models import DERIVED_TEXT_FIELDS, Post
+
+
+class Command(BaseCommand):
+    help = "คำนวณ excerpt / plain_text / reading_time ของโพสต์ย้อนหลัง"
+
+    def add_arguments(self, p):
+        p.add_argument("--all", action="store_true", help="คำนวณใหม่ทุกโพสต์")
+        p.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *a, **o):
+        qs = Post.objects.only("id", "content").order_by("id")
+        if not o["all"]:
+            qs = qs.filter(reading_time=0)
+
+        batch, done = [], 0
+        # bulk_update ไม่เรียก save() — updated_at จึงไม่เปลี่ยน
+        for post in qs.iterator(chunk_size=o["batch_size"]):
+            post.refresh_derived_text()
+            batch.append(post)
+            if len(batch) >= o["batch_size"]:
+                Post.objects.bulk_update(batch, DERIVED_TEXT_FIELDS)
+                done += len(batch)
+                batch = []
+        if batch:
+            Post.objects.bulk_update(batch, DERIVED_TEXT_FIELDS)
+            done += len(batch)
+
+        self.stdout.write(self.style.SUCCESS("คำนวณแล้ว %d โพสต์" % done))
@@ -0,0 +1,44 @@
+"""คำนวณ simhash ของ Post / Video ที่มีอยู่แล้ว (blog/simhash.py)
+
+    python manage.py backfill_simhash
+
+โพสต์/วิดีโอใหม่หรือที่แก้เนื้อหาจะคำนวณเองตอนบันทึก
+คำสั่งนี้ใช้ครั้งเดียวหลัง migrate หรือเมื่อเปลี่ยนสูตร (ใส่ --all)
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, Video, html_to_plain_text, text_simhash
+
+
+class Command(BaseCommand):
+    help = "คำนวณ simhash ของ Post / Video ย้อนหลัง"
+
+    def add_arguments(self, p):
+        p.add_argument("--all", action="store_true", help="คำนวณใหม่ทุกแถว")
+        p.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *a, **o):
+        specs = (
+            (Post, "content", lambda obj: text_simhash(html_to_plain_text(obj.content))),
+            (Video, "description", lambda obj: text_simhash(html_to_plain_text(obj.description))),
+        )
+        for model, field, compute in specs:
+            qs = model.objects.only("id", field).order_by("id")
+            if not o["all"]:
+                qs = qs.filter(simhash__isnull=True)
+
+            batch, done = [], 0
+            # bulk_update ไม่เรียก save() — updated_at จึงไม่เปลี่ยน
+            for obj in qs.iterator(chunk_size=o["batch_size"]):
+                obj.simhash = compute(obj)
+                batch.append(obj)
+                if len(batch) >= o["batch_size"]:
+                    model.objects.bulk_update(batch, ["simhash"])
+                    done += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ["simhash"])
+                done += len(batch)
+            self.stdout.write(self.style.SUCCESS(
+                "%s: คำนวณแล้ว %d แถว" % (model._meta.verbose_name, done)))
@@ -0,0 +1,83 @@
+"""วัดความแม่นของการเดา Category กับโพสต์ที่คนจัดหมวดไว้แล้ว
+
+    python manage.py evaluate_category_classifier
+    python manage.py evaluate_category_classifier --folds 10 --thresholds 0.3,0.5,0.7
+
+วัดสองแบบกับข้อมูลชุดเดียวกัน
+  - keyword   : guess_category() จาก CATEGORY_KEYWORDS — ตัวเลข 97% ใน docstring
+                ของ import_facebook_posts มาจากวิธีนี้ (จับคู่ไม่ได้นับเป็นผิด)
+  - classifier: cross-validation แบ่ง fold ตาม id (ผลเท่ากันทุกครั้งที่รัน)
+                เทรนจาก fold อื่นแล้วทายโพสต์ใน fold ที่เหลือ ไม่ใช้ไฟล์ model ที่บันทึกไว้
+แยกรายงานตาม threshold: coverage = สัดส่วนที่มั่นใจพอจะใส่หมวดให้,
+accuracy = ถูกกี่ % ในส่วนที่ใส่ให้, overall = ถูกกี่ % ของทั้งหมด
+"""
+
+import zlib
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.category_classifier import MAX_FEATURES, CategoryClassifier, labelled_examples
+from blog.management.commands.import_facebook_posts import FALLBACK_CATEGORY, guess_category
+
+
+def fold_of(key, folds):
+    return zlib.crc32(key.encode()) % folds
+
+
+class Command(BaseCommand):
+    help = "วัดความแม่นของ keyword matcher และตัวจัด Category กับโพสต์ที่จัดหมวดแล้ว"
+
+    def add_arguments(self, p):
+        p.add_argument("--folds", type=int, default=5)
+        p.add_argument("--thresholds", default="0,0.3,0.5,0.7,0.9",
+                       help="คั่นด้วย , (ค่าเริ่มต้น 0,0.3,0.5,0.7,0.9)")
+        p.add_argument("--max-features", type=int, default=MAX_FEATURES)
+        p.add_argument("--include-fallback", action="store_true",
+                       help="นับโพสต์ในหมวด '%s' ด้วย" % FALLBACK_CATEGORY)
+
+    def handle(self, *a, **o):
+        exclude = () if o["include_fallback"] else (FALLBACK_CATEGORY,)
+        rows = labelled_examples(exclude=exclude)
+        folds = max(2, o["folds"])
+        thresholds = [float(t) for t in o["thresholds"].split(",") if t.strip()]
+        if len(rows) < folds:
+            raise CommandError("มีโพสต์ที่จัดหมวดแล้วแค่ %d โพสต์" % len(rows))
+
+        total = len(rows)
+        keyword_hits = sum(guess_category(text) == label for text, label, _ in rows)
+        self.stdout.write("โพสต์ที่จัดหมวดแล้ว %d | %d หมวด"
+                          % (total, len({label for _, label, _ in rows})))
+        self.stdout.write("keyword    : ถูก %d/%d = %.1f%%"
+                          % (keyword_hits, total, 100.0 * keyword_hits / total))
+
+        # (confidence, ถูกไหม) ของทุกโพสต์ ทายตอนที่โพสต์นั้นไม่อยู่ในชุดเทรน
+        scored = []
+        per_label = Counter()
+        for k in range(folds):
+            train = [r for r in rows if fold_of(r[2], folds) != k]
+            test = [r for r in rows if fold_of(r[2], folds) == k]
+            if not test or len({label for _, label, _ in train}) < 2:
+                continue
+            model = CategoryClassifier.train([t for t, _, _ in train], [label for _, label, _ in train],
+                                             max_features=o["max_features"])
+            for (text, label, _), (guess, confidence) in zip(
+                    test, model.predict([t for t, _, _ in test], threshold=0)):
+                scored.append((confidence, guess == label))
+                per_label[label, guess == label] += 1
+
+        self.stdout.write("classifier : %d-fold cross-validation (%d โพสต์)" % (folds, len(scored)))
+        self.stdout.write("  %9s %9s %9s %9s" % ("threshold", "coverage", "accuracy", "overall"))
+        for t in thresholds:
+            kept = [ok for confidence, ok in scored if confidence >= t]
+            hits = sum(kept)
+            self.stdout.write("  %9.2f %8.1f%% %8.1f%% %8.1f%%" % (
+                t, 100.0 * len(kept) / len(scored),
+                100.0 * hits / len(kept) if kept else 0.0,
+                100.0 * hits / len(scored)))
+
+        self.stdout.write("")
+        for label in sorted({label for label, _ in per_label}):
+            right, wrong = per_label[label, True], per_label[label, False]
+            self.stdout.write("  %-28s %4d/%-4d %5.1f%%" % (
+                label, right, right + wrong, 100.0 * right / (right + wrong)))
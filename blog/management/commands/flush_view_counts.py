@@ -0,0 +1,22 @@
+"""เขียนยอดเข้าชมที่ค้างอยู่ลงฐานข้อมูล
+
+    python manage.py flush_view_counts
+
+ยอดเข้าชมถูกเก็บใน worker แล้วเขียนเป็นรอบ (ดู blog/view_counter.py)
+รอบไหนเขียนไม่สำเร็จจะถูกพักไว้เป็นไฟล์ใน VIEW_COUNT_SPOOL_DIR
+คำสั่งนี้เก็บกวาดไฟล์เหล่านั้น ตั้ง cron ไว้หรือรันหลัง deploy ก็ได้
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog.view_counter import drain_spool, flush_view_counts, spool_dir
+
+
+class Command(BaseCommand):
+    help = "เขียนยอดเข้าชมที่พักไว้ลงฐานข้อมูล"
+
+    def handle(self, *a, **o):
+        flush_view_counts()
+        files, views = drain_spool()
+        self.stdout.write(self.style.SUCCESS(
+            "เขียนยอดเข้าชมแล้ว %d ครั้ง จาก %d ไฟล์ (%s)" % (views, files, spool_dir())))
@@ -6,36 +6,67 @@
 กันนำเข้าซ้ำด้วย Post.source_id ซึ่ง unique — รันกี่รอบก็ไม่ได้โพสต์ซ้ำ
 จึงปลอดภัยพอจะตั้ง cron หรือให้ agent สั่งรัน
 
+ถ้าไม่ใส่ --since จะต่อจาก ImportCursor ที่บันทึกไว้หลังเขียนแต่ละหน้าของ Graph
+cron จึงขอเฉพาะโพสต์ใหม่ (--ignore-cursor เพื่อไล่ใหม่ทั้งหมด)
+
+แทน cron ได้ด้วย --daemon: process เดียวค้างไว้ ดึงโพสต์ใหม่ทุก --interval วินาที
+ใช้ GraphClient / connection pool / credential / index ชุดเดิมข้ามรอบ
+
+    python manage.py import_facebook_posts --daemon --interval 300 --status published
+
+ทุกการรันที่เขียนฐานข้อมูล (cron หรือ daemon) ต้องถือ ImportLease ของเพจก่อน
+รันซ้อนกันหรือรันหลายเครื่อง จึงมีตัวเดียวที่ทำงาน ตัวอื่นข้ามรอบไป
+
+ถ้าเปิด webhook ของเพจไว้ (blog/webhooks.py) process_facebook_webhooks นำเข้าเฉพาะโพสต์
+ที่ Facebook แจ้งมา ด้วย prepare() / import_batch() ชุดเดียวกับคำสั่งนี้
+
 สิ่งที่เดาให้อัตโนมัติ
-  - category : จับคู่จากคำสำคัญในเนื้อหา (วัดกับโพสต์ที่คนจัดไว้แล้วได้ 97%)
-               ถ้าไม่มั่นใจจะปล่อยว่าง ไม่เดามั่ว
+  - category : ใช้ model จาก train_category_classifier (char n-gram, blog/category_classifier.py)
+               ถ้ายังไม่เคยเทรนจะจับคู่จากคำสำคัญในเนื้อหา (วัดกับโพสต์ที่คนจัดไว้แล้วได้ 97%
+               ดู evaluate_category_classifier) ไม่มั่นใจจะใส่ FALLBACK_CATEGORY ไม่เดามั่ว
+  - โพสต์ซ้ำ : ข้อความเกือบเหมือนโพสต์/วิดีโอที่มีอยู่ (SimHash, blog/simhash.py)
+               นำเข้าเป็น draft และรายงาน หรือข้ามด้วย --near-duplicates skip
   - post type: อ่านจาก media_type ที่ Graph API บอก (video/photo/album/link)
                แม่นยำเพราะ API บอกเอง ไม่ใช่การเดา
-  - รูปหน้าปก : โหลดจาก full_picture (วิดีโอจะได้ thumbnail)
+  - รูปหน้าปก : โหลดจาก full_picture (วิดีโอจะได้ thumbnail) พร้อมกันหลายรูป
+               ล่วงหน้าก่อนเขียนฐานข้อมูล (--workers, blog/image_fetcher.py)
+
+คุยกับ Graph ผ่าน blog/graph_client.py (keep-alive, retry + backoff, ชะลอตาม usage header)
 
-credential อ่านตามลำดับ
-  1. env FACEBOOK_PAGE_ID / FACEBOOK_PAGE_TOKEN
+credential อ่านตามลำดับ (จำไว้ --credential-ttl วินาที)
+  1. env FACEBOOK_PAGE_ID / FACEBOOK_PAGE_TOKEN — ครบแล้วไม่เรียก az เลย
   2. ถ้าไม่มี ดึงจาก Azure Bot channel ผ่าน az CLI (สะดวกตอนรันในเครื่อง)
 """
 
 import html
 import json
 import os
+import queue
 import re
+import signal
+import socket
 import subprocess
+import threading
+import time
 import urllib.parse
-import urllib.request
+import uuid
+from contextlib import closing
 from datetime import datetime, timedelta, timezone as dt_timezone
 
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from blog.models import Category, Post, PostType, Video
+from blog import media_store
+from blog.category_classifier import load_default
+from blog.graph_client import GraphClient, GraphError
+from blog.image_fetcher import DEFAULT_WORKERS, ImageFetcher
+from blog.models import (Category, ImportCursor, ImportLease, Post, PostType, Video,
+                         html_to_plain_text, text_simhash)
+from blog.simhash import MAX_DISTANCE as SIMHASH_DISTANCE, SimHashIndex
 
-GRAPH = "https://graph.facebook.com/v21.0/"
 FIELDS = ("id,message,created_time,status_type,full_picture,permalink_url,"
           "attachments{media_type,type}")
 
@@ -100,21 +131,124 @@ def credentials_from_azure():
         return None, None
 
 
-def _fetch(url):
+# Graph error code ของ access token ที่หมดอายุ/ถูกเพิกถอน
+TOKEN_ERROR = 190
+
+
+def credentials_from_env():
+    return os.environ.get("FACEBOOK_PAGE_ID") or "", os.environ.get("FACEBOOK_PAGE_TOKEN") or ""
+
+
+class CredentialCache:
+    """page id + token ที่จำไว้ไม่เกิน ttl วินาที
+
+    env มาก่อนเสมอ — เรียก az CLI (ช้า ครั้งละหลายวินาที) เฉพาะเมื่อ env ไม่ครบ
+    daemon เรียก invalidate() เมื่อ Graph บอกว่า token ใช้ไม่ได้ (code 190)
+    """
+
+    def __init__(self, ttl=3600, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._value, self._expires = None, 0.0
+
+    def get(self):
+        if self._value is None or self.clock() >= self._expires:
+            page_id, token = credentials_from_env()
+            if not page_id or not token:
+                az_page, az_token = credentials_from_azure()
+                page_id, token = page_id or az_page, token or az_token
+            if not page_id or not token:
+                raise CommandError("ไม่พบ credential — ตั้ง FACEBOOK_PAGE_ID / FACEBOOK_PAGE_TOKEN "
+                                   "หรือ az login ให้เข้าถึง Azure Bot channel")
+            self._value, self._expires = (page_id, token), self.clock() + self.ttl
+        return self._value
+
+    def invalidate(self):
+        self._value = None
+
+
+def with_fields(url, fields):
+    """URL เดิม (รวม cursor after/before ของ paging) แต่เปลี่ยน fields ที่ขอ"""
+    parts = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query) if k != "fields"]
+    query.append(("fields", fields))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def fetch_page(client, url):
+    """JSON ของหน้านั้น — ยก CommandError ถ้าดึงไม่สำเร็จหลัง retry ครบแล้ว"""
     try:
-        with urllib.request.urlopen(url, timeout=60) as r:
-            return json.load(r), None
-    except urllib.error.HTTPError as e:
-        try:
-            return None, json.load(e)
-        except Exception:
-            return None, {"error": {"message": e.read().decode()[:250]}}
-    except Exception as e:
-        return None, {"error": {"message": str(e)[:250]}}
+        return client.get(url)
+    except GraphError as e:
+        raise CommandError("ดึงโพสต์ไม่สำเร็จ: %s" % str(e)[:200]) from e
+
+
+def iter_pages(client, url):
+    """ไล่ paging.next ไปเรื่อย ๆ ทีละหน้า (ใหม่ -> เก่า ตามที่ Graph คืน) ไม่จำกัดจำนวนหน้า"""
+    while url:
+        data = fetch_page(client, url)
+        batch = data.get("data", [])
+        if not batch:
+            return
+        yield batch
+        url = (data.get("paging") or {}).get("next")
+
+
+def list_pages(client, url):
+    """รอบแรกของการไล่เก่า -> ใหม่: ขอแค่ id คืน [(URL ของหน้าแบบ fields เต็ม, จำนวนโพสต์)]"""
+    pages = []
+    url = with_fields(url, "id")
+    while url:
+        data = fetch_page(client, url)
+        n = len(data.get("data", []))
+        if not n:
+            break
+        pages.append((with_fields(url, FIELDS), n))
+        url = (data.get("paging") or {}).get("next")
+    return pages
+
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=1):
+    """ไล่ iterable ใน thread พื้นหลัง — หน้าถัดไปถูกดึงระหว่างที่หน้าปัจจุบันกำลังถูกเขียน
+
+    ถือไว้ไม่เกิน depth รายการ exception ฝั่ง thread ถูกยกต่อให้ผู้เรียก
+    """
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
+    def worker():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((None, e))
+            return
+        put((_DONE, None))
 
-def graph(path, params):
-    return _fetch(GRAPH + path + "?" + urllib.parse.urlencode(params))
+    threading.Thread(target=worker, name="graph-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, err = q.get()
+            if err is not None:
+                raise err
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
 
 
 def first_line(message):
@@ -166,11 +300,79 @@ def guess_category(text):
     return best
 
 
+def guess_categories(classifier, messages):
+    """ชื่อ Category ของทุกข้อความในหน้าเดียว (None = ไม่มั่นใจ)
+
+    มี model จาก train_category_classifier ก็ให้คะแนนทั้งหน้าด้วย matrix multiply ครั้งเดียว
+    ไม่มีก็ใช้ CATEGORY_KEYWORDS ทีละโพสต์แบบเดิม
+    """
+    if classifier is None:
+        return [guess_category(m) for m in messages]
+    return [name for name, _ in classifier.predict(messages)]
+
+
 def media_type_of(post):
     att = (post.get("attachments") or {}).get("data") or [{}]
     return att[0].get("media_type") or ""
 
 
+def parse_created_time(value):
+    """created_time ของ Graph (เช่น 2026-03-14T10:00:00+0000) -> datetime หรือ None"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return None
+
+
+def existing_source_ids(ids):
+    """source_id ที่มีอยู่แล้วใน Post หรือ Video — query เดียวสำหรับทั้งหน้า"""
+    ids = [i for i in ids if i]
+    if not ids:
+        return set()
+    posts = Post.objects.filter(source_id__in=ids).order_by().values_list("source_id", flat=True)
+    videos = Video.objects.filter(source_id__in=ids).order_by().values_list("source_id", flat=True)
+    return set(posts.union(videos))
+
+
+def advance_cursor(name, post):
+    """เลื่อน ImportCursor ไปที่ post นี้ — ไม่ถอยหลัง (เช่นตอน backfill ช่วงเก่าด้วย --until)"""
+    created_time = parse_created_time(post.get("created_time"))
+    if created_time is None:
+        return
+    cursor, _ = ImportCursor.objects.get_or_create(name=name)
+    if cursor.created_time is None or created_time >= cursor.created_time:
+        cursor.created_time = created_time
+        cursor.source_id = post.get("id") or ""
+        cursor.save()
+
+
+def lease_holder():
+    return "%s:%d:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+
+def acquire_lease(name, holder, ttl):
+    """True ถ้าได้ (หรือต่ออายุ) lease ชื่อนี้ — ผู้ถือเดิมหรือ lease ที่หมดอายุแล้วเท่านั้น"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+    taken = (ImportLease.objects.filter(name=name)
+             .filter(Q(holder=holder) | Q(expires_at__lte=now))
+             .update(holder=holder, expires_at=expires_at))
+    if taken:
+        return True
+    try:
+        with transaction.atomic():
+            ImportLease.objects.create(name=name, holder=holder, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def release_lease(name, holder):
+    ImportLease.objects.filter(name=name, holder=holder).delete()
+
+
 def parse_since(value):
     if not value:
         return None
@@ -193,109 +395,268 @@ class Command(BaseCommand):
         p.add_argument("--post-type", default="Facebook Post", help="PostType เมื่อเดาไม่ได้")
         p.add_argument("--status", default="draft", choices=["draft", "published", "archived"])
         p.add_argument("--no-images", action="store_true", help="ไม่ต้องโหลดรูปหน้าปก")
+        p.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help="จำนวนรูปที่โหลดพร้อมกัน")
         p.add_argument("--no-category", action="store_true", help="ไม่ต้องเดา category")
+        p.add_argument("--near-duplicates", choices=["flag", "skip", "off"], default="flag",
+                       help="โพสต์ที่ข้อความเกือบซ้ำกับที่มีอยู่: flag = นำเข้าเป็น draft และรายงาน, "
+                            "skip = ไม่นำเข้า, off = ไม่ตรวจ (ค่าเริ่มต้น flag)")
+        p.add_argument("--near-duplicate-distance", type=int, default=SIMHASH_DISTANCE,
+                       help="ต่างกันไม่เกินกี่บิตจาก 64 บิตถึงนับว่าซ้ำ (ค่าเริ่มต้น %d)" % SIMHASH_DISTANCE)
         p.add_argument("--newest-first", action="store_true",
                        help="เรียงใหม่->เก่า (ปกติเรียงเก่า->ใหม่ตาม timeline คอนเทนต์)")
+        p.add_argument("--max-retries", type=int, default=5,
+                       help="จำนวนครั้งที่ลองใหม่เมื่อ Graph ตอบ error ชั่วคราว")
+        p.add_argument("--ignore-cursor", action="store_true",
+                       help="ไม่ใช้ cursor ของรอบก่อน ไล่ใหม่ตั้งแต่ --since (หรือทั้งหมด)")
         p.add_argument("--dry-run", action="store_true", help="แสดงผลอย่างเดียว ไม่เขียนฐานข้อมูล")
+        p.add_argument("--daemon", action="store_true",
+                       help="ทำงานค้างไว้ ดึงโพสต์ใหม่ทุก --interval วินาที (แทน cron)")
+        p.add_argument("--interval", type=int, default=300, help="วินาทีระหว่างรอบของ --daemon")
+        p.add_argument("--max-passes", type=int, default=None,
+                       help="--daemon: หยุดหลังครบกี่รอบ (ไม่ใส่ = จนกว่าจะสั่งหยุด)")
+        p.add_argument("--lease-ttl", type=int, default=None,
+                       help="อายุ lease (วินาที) ค่าเริ่มต้น 2 เท่าของ --interval แต่ไม่ต่ำกว่า 600")
+        p.add_argument("--credential-ttl", type=int, default=3600,
+                       help="จำ credential ไว้กี่วินาทีก่อนอ่านใหม่ (--daemon)")
 
     def handle(self, *a, **o):
-        page_id, token = credentials_from_azure()
-        page_id = os.environ.get("FACEBOOK_PAGE_ID") or page_id
-        token = os.environ.get("FACEBOOK_PAGE_TOKEN") or token
-        if not page_id or not token:
-            raise CommandError("ไม่พบ credential — ตั้ง FACEBOOK_PAGE_ID / FACEBOOK_PAGE_TOKEN "
-                               "หรือ az login ให้เข้าถึง Azure Bot channel")
-
-        dry = o["dry_run"]
+        self.credentials = CredentialCache(ttl=o["credential_ttl"])
+        self.holder = lease_holder()
+        self.lease_ttl = o["lease_ttl"] or max(600, o["interval"] * 2)
+        self.lease = None
+        self._near_index = self._classifier = None
+
+        with GraphClient(max_retries=o["max_retries"]) as client, \
+                ImageFetcher(workers=o["workers"]) as fetcher:
+            try:
+                if o["daemon"]:
+                    self.daemon(o, client, fetcher)
+                else:
+                    self.run_leased(o, client, fetcher)
+            finally:
+                if self.lease:
+                    release_lease(self.lease, self.holder)
+
+    def daemon(self, o, client, fetcher):
+        """วนดึงโพสต์ใหม่ทุก --interval วินาที จนได้ SIGTERM / SIGINT
+
+        ถือ lease ไว้ตลอด (ต่ออายุทุกรอบและทุกหน้า) เครื่องอื่นที่รัน --daemon ด้วยจะรอเฉย ๆ
+        จนกว่า process นี้หยุดหรือตายจน lease หมดอายุ แล้วจึงรับช่วงต่อ
+        """
+        stop = threading.Event()
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                previous[sig] = signal.signal(sig, lambda *_: stop.set())
         try:
-            author = User.objects.get(username=o["author"])
-        except User.DoesNotExist:
-            raise CommandError("ไม่พบ user '%s' (มีอยู่: %s)" % (
-                o["author"], ", ".join(User.objects.values_list("username", flat=True)[:5])))
+            self._loop(o, client, fetcher, stop)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    def _loop(self, o, client, fetcher, stop):
+        passes = 0
+        while not stop.is_set():
+            # connection ที่ค้างนานอาจถูกฐานข้อมูลตัดไปแล้ว
+            close_old_connections()
+            try:
+                self.run_leased(o, client, fetcher)
+            except GraphError as e:
+                self.stdout.write(self.style.WARNING("รอบนี้ล้มเหลว: %s" % str(e)[:200]))
+            except CommandError as e:
+                self.stdout.write(self.style.WARNING("รอบนี้ล้มเหลว: %s" % e))
+            passes += 1
+            if o["max_passes"] and passes >= o["max_passes"]:
+                break
+            # --since ใช้แค่รอบแรก หลังจากนั้นต่อจาก cursor
+            o = dict(o, since=None)
+            stop.wait(o["interval"])
+        self.stdout.write("หยุด daemon หลัง %d รอบ" % passes)
+
+    def run_leased(self, o, client, fetcher):
+        page_id, token = self.credentials.get()
+        if not o["dry_run"]:
+            name = self.lease_name(page_id)
+            if not acquire_lease(name, self.holder, self.lease_ttl):
+                lease = ImportLease.objects.filter(name=name).first()
+                self.stdout.write(self.style.WARNING(
+                    "มีตัวนำเข้าอื่นทำงานอยู่ (%s ถึง %s) — ข้ามรอบนี้" % (
+                        lease.holder if lease else "?",
+                        timezone.localtime(lease.expires_at).strftime("%H:%M:%S") if lease else "?")))
+                return
+            self.lease = name
+        try:
+            self.run_once(o, client, fetcher, page_id, token)
+        except CommandError as e:
+            if getattr(e.__cause__, "code", None) == TOKEN_ERROR:
+                # token หมดอายุหรือถูกเพิกถอน — รอบหน้าอ่าน credential ใหม่
+                self.credentials.invalidate()
+            raise
+
+    def lease_name(self, page_id):
+        return "facebook:%s" % page_id
 
-        fallback_type = PostType.objects.filter(name=o["post_type"]).first()
-        types_by_name = {t.name: t for t in PostType.objects.all()}
-        cats_by_name = {c.name: c for c in Category.objects.all()}
+    def renew_lease(self):
+        if self.lease and not acquire_lease(self.lease, self.holder, self.lease_ttl):
+            self.lease = None
+            raise CommandError("lease ถูกตัวนำเข้าอื่นรับช่วงไปแล้ว — หยุดรอบนี้")
+
+    def run_once(self, o, client, fetcher, page_id, token):
+        self.prepare(o)
 
         params = {"fields": FIELDS, "limit": o["limit"], "access_token": token}
         since, until = parse_since(o.get("since")), o.get("until")
+        cursor_name = "facebook:%s" % page_id
+        cursor = None if o["ignore_cursor"] else ImportCursor.objects.filter(name=cursor_name).first()
+        if not since and cursor and cursor.created_time:
+            # ต่อจากที่นำเข้าไว้ล่าสุด — โพสต์ที่เวลาเดียวกับ cursor จะถูกกันซ้ำด้วย source_id
+            since = str(int(cursor.created_time.timestamp()))
         if since:
             params["since"] = since
         if until:
             params["until"] = until
 
         self.stdout.write("เพจ %s | ช่วง %s .. %s | ผู้เขียน %s | สถานะ %s%s" % (
-            page_id, since or "-", until or "-", author.username, o["status"],
-            self.style.WARNING("  [DRY RUN]") if dry else ""))
+            page_id, since or "-", until or "-", self.author.username, o["status"],
+            self.style.WARNING("  [DRY RUN]") if o["dry_run"] else ""))
+        if cursor and cursor.created_time and not o.get("since"):
+            self.stdout.write("ต่อจาก cursor %s (%s)" % (
+                timezone.localtime(cursor.created_time).strftime("%Y-%m-%d %H:%M"), cursor.source_id))
+
+        # ---- ดึงโพสต์ (ไล่ paging แบบ stream) ----
+        first_url = client.url(f"{page_id}/posts?" + urllib.parse.urlencode(params))
+        if o["newest_first"]:
+            batches = prefetch(iter_pages(client, first_url))
+            self.stdout.write("ไล่หน้าใหม่->เก่า\n")
+        else:
+            # Graph คืนโพสต์ใหม่สุดก่อน แต่เราต้องการไล่ตาม timeline ของคอนเทนต์
+            # เรียงเก่า -> ใหม่ เพื่อให้ --max หยิบโพสต์ที่ถัดจาก --since จริง ๆ
+            # รอบแรกขอแค่ id เพื่อเก็บ URL ของทุกหน้า รอบสองดึงเต็มจากหน้าสุดท้ายย้อนขึ้นมา
+            # หน่วยความจำจึงเท่ากับ URL หนึ่งบรรทัดต่อหน้า ไม่ใช่ทุกโพสต์ในช่วงเวลา
+            listing = list_pages(client, first_url)
+            if not listing:
+                self.stdout.write(self.style.WARNING("ไม่มีโพสต์ในช่วงที่ระบุ"))
+                return
+            self.stdout.write("พบ %d โพสต์ (%d หน้า) — เรียง เก่า->ใหม่\n" % (
+                sum(n for _, n in listing), len(listing)))
+            batches = (sorted(batch, key=lambda x: x.get("created_time") or "")
+                       for batch in prefetch(fetch_page(client, url).get("data", [])
+                                             for url, _ in reversed(listing)))
+
+        with closing(batches):
+            for batch in batches:
+                last, done = self.import_batch(batch, o, fetcher)
+                if not o["dry_run"]:
+                    if last is not None and not o["newest_first"]:
+                        advance_cursor(cursor_name, last)
+                    self.renew_lease()
+                if done:
+                    break
 
-        # ---- ดึงโพสต์ (ไล่ paging) ----
-        posts, next_url, pages = [], None, 0
-        while True:
-            data, err = _fetch(next_url) if next_url else graph(f"{page_id}/posts", params)
-            if err:
-                raise CommandError("ดึงโพสต์ไม่สำเร็จ: %s"
-                                   % err.get("error", {}).get("message", "")[:200])
-            batch = data.get("data", [])
-            posts.extend(batch)
-            pages += 1
-            next_url = (data.get("paging") or {}).get("next")
-            if not next_url or not batch or pages >= 20:
-                break
-        if not posts:
+        if not self.report["seen"]:
             self.stdout.write(self.style.WARNING("ไม่มีโพสต์ในช่วงที่ระบุ"))
             return
+        self.print_report(o, client, fetcher)
 
-        # Graph คืนโพสต์ใหม่สุดก่อน แต่เราต้องการไล่ตาม timeline ของคอนเทนต์
-        # เรียงเก่า -> ใหม่ เพื่อให้ --max หยิบโพสต์ที่ถัดจาก --since จริง ๆ
-        if not o["newest_first"]:
-            posts.sort(key=lambda x: x.get("created_time") or "")
-        self.stdout.write("ดึงมาได้ %d โพสต์ (%d หน้า) — เรียง %s\n" % (
-            len(posts), pages, "ใหม่->เก่า" if o["newest_first"] else "เก่า->ใหม่"))
-
-        created = skipped = empty = 0
-        n_video = n_post = 0
-        quote_titles, no_category, forced_draft, no_image = [], [], [], 0
+    def prepare(self, o):
+        """โหลดสิ่งที่ใช้ร่วมกันทั้งรอบ (ผู้เขียน, ประเภท, หมวด, index โพสต์ซ้ำ) และล้างตัวนับ"""
+        try:
+            self.author = User.objects.get(username=o["author"])
+        except User.DoesNotExist:
+            raise CommandError("ไม่พบ user '%s' (มีอยู่: %s)" % (
+                o["author"], ", ".join(User.objects.values_list("username", flat=True)[:5])))
 
-        for p in posts:
-            if o["max_posts"] and created >= o["max_posts"]:
+        self.fallback_type = PostType.objects.filter(name=o["post_type"]).first()
+        self.types_by_name = {t.name: t for t in PostType.objects.all()}
+        self.cats_by_name = {c.name: c for c in Category.objects.all()}
+        # โหลด simhash ของทุกโพสต์/วิดีโอครั้งเดียว แต่ละโพสต์ใหม่เช็คด้วย dict lookup
+        # daemon ถือ index ไว้ข้ามรอบ รอบถัดไปโหลดเพิ่มเฉพาะแถวที่ใหม่กว่า
+        if o["near_duplicates"] != "off":
+            if self._near_index is None:
+                self._near_index = SimHashIndex.from_db(o["near_duplicate_distance"])
+            else:
+                self._near_index.update_from_db()
+        if not o["no_category"]:
+            if self._classifier is None:
+                self._classifier = load_default()
+            self.stdout.write("เดา category ด้วย %s" % (
+                "model %d หมวด (confidence >= %.2f)" % (
+                    len(self._classifier.classes), self._classifier.threshold)
+                if self._classifier else "CATEGORY_KEYWORDS"))
+
+        self.report = {
+            "created": 0, "skipped": 0, "empty": 0, "written": 0, "seen": 0, "no_image": 0,
+            "near_skipped": 0, "quote_titles": [], "no_category": [], "forced_draft": [],
+            "near_duplicates": [], "started": time.monotonic(),
+        }
+
+    def import_batch(self, batch, o, fetcher):
+        """วางแผนแล้วเขียนโพสต์หนึ่งชุดจาก Graph — คืน (โพสต์สุดท้ายที่ดูแล้ว, ครบ --max แล้วหรือยัง)"""
+        report = self.report
+        near_mode = o["near_duplicates"]
+        near_index = self._near_index if near_mode != "off" else None
+        report["seen"] += len(batch)
+        # กันซ้ำทั้งหน้าด้วย query เดียว (Post และ Video)
+        existing = existing_source_ids([p.get("id") for p in batch])
+        guessed_by_id = {}
+        if not o["no_category"]:
+            todo = [p for p in batch if p.get("id") not in existing and p.get("message")]
+            guessed_by_id = dict(zip([p.get("id") for p in todo], guess_categories(
+                self._classifier, [p["message"] for p in todo])))
+
+        # ---- วางแผน: ตัดสินใจทุกอย่างที่ไม่ต้องใช้เน็ตก่อน ----
+        rows, last, done = [], None, False
+        for p in batch:
+            if o["max_posts"] and report["created"] >= o["max_posts"]:
+                done = True
                 break
+            last = p
 
             fbid = p.get("id")
             message = p.get("message") or ""
             title = make_title(message)
 
             if not title:
-                empty += 1
+                report["empty"] += 1
                 continue
-            if Post.objects.filter(source_id=fbid).exists():
-                skipped += 1
+            mtype = media_type_of(p)
+            is_video = mtype == "video"
+            if fbid in existing:
+                report["skipped"] += 1
                 continue
 
-            mtype = media_type_of(p)
-            ptype = fallback_type
+            near = None
+            if near_index is not None:
+                h = text_simhash(html_to_plain_text(to_html(message)))
+                near = near_index.nearest(h)
+                if near and near_mode == "skip":
+                    report["near_skipped"] += 1
+                    continue
+                # โพสต์ในรอบเดียวกันก็เทียบกันเองด้วย
+                near_index.add(("facebook", fbid), h)
+
+            ptype = self.fallback_type
             for name in MEDIA_TO_POSTTYPE.get(mtype, []):
-                if name in types_by_name:
-                    ptype = types_by_name[name]
+                if name in self.types_by_name:
+                    ptype = self.types_by_name[name]
                     break
 
             cat = None
             if not o["no_category"]:
-                guessed = guess_category(message)
-                cat = cats_by_name.get(guessed) if guessed else None
+                guessed = guessed_by_id.get(fbid)
+                cat = self.cats_by_name.get(guessed) if guessed else None
                 if cat is None:
-                    cat = cats_by_name.get(FALLBACK_CATEGORY)
-                    no_category.append(title)
+                    cat = self.cats_by_name.get(FALLBACK_CATEGORY)
+                    report["no_category"].append(title)
 
-            published_at = None
             ct = p.get("created_time")
-            if ct:
-                try:
-                    published_at = datetime.strptime(ct, "%Y-%m-%dT%H:%M:%S%z")
-                except ValueError:
-                    published_at = timezone.now()
+            published_at = parse_created_time(ct)
+            if ct and published_at is None:
+                published_at = timezone.now()
 
             if starts_with_quote(title):
-                quote_titles.append(title)
+                report["quote_titles"].append(title)
 
             # หน้าเว็บ Next.js อ่าน category.name ตรง ๆ หลายจุดโดยไม่กัน null
             # โพสต์ published ที่ไม่มี category จึงทำให้หน้าแรกทั้งหน้าพัง
@@ -303,13 +664,16 @@ class Command(BaseCommand):
             row_status = o["status"]
             if cat is None and row_status == "published":
                 row_status = "draft"
-                forced_draft.append(title)
+                report["forced_draft"].append(title)
+            if near:
+                # ให้คนดูก่อนว่าเป็นโพสต์ซ้ำหรือเนื้อหาใหม่จริง
+                row_status = "draft" if row_status == "published" else row_status
+                report["near_duplicates"].append((title, "%s:%s" % near[0], near[1]))
 
             pic = p.get("full_picture")
             if not pic:
-                no_image += 1
+                report["no_image"] += 1
 
-            is_video = mtype == "video"
             self.stdout.write(self.style.SUCCESS(
                 "  + [%s] %s" % ("วิดีโอ" if is_video else "โพสต์", title)))
             self.stdout.write("      %s | %s | %s | %s" % (
@@ -318,88 +682,64 @@ class Command(BaseCommand):
                 ptype.name if ptype else "ไม่ระบุประเภท",
                 cat.name if cat else self.style.WARNING("ไม่มี category")))
 
-            created += 1
-            if dry:
-                continue
-
-            if is_video:
-                if Video.objects.filter(source_id=fbid).exists():
-                    skipped += 1
-                    continue
-                with transaction.atomic():
-                    vid = Video.objects.create(
-                        title=title[:200],
-                        description=to_html(message),
-                        video_url=p.get("permalink_url") or "",
-                        category=cat,
-                        author=author,
-                        status=row_status,
-                        published_at=published_at,
-                        thumbnail_alt=title[:200],
-                        source="facebook",
-                        source_id=fbid,
-                    )
-                    if pic and not o["no_images"]:
-                        try:
-                            req = urllib.request.Request(
-                                pic, headers={"User-Agent": "civicblogs-import"})
-                            with urllib.request.urlopen(req, timeout=60) as r:
-                                blob = r.read()
-                            vid.thumbnail.save("fb_%s.jpg" % fbid.split("_")[-1],
-                                               ContentFile(blob), save=True)
-                        except Exception as e:
-                            self.stdout.write(self.style.WARNING(
-                                "      โหลดรูปไม่สำเร็จ: %s" % str(e)[:80]))
-                created += 1
-                continue
-
-            with transaction.atomic():
-                post = Post.objects.create(
-                    title=title[:200],
-                    author=author,
-                    category=cat,
-                    post_type=ptype,
-                    content=to_html(message),
-                    status=row_status,
-                    published_at=published_at,
-                    meta_description=first_line(message)[:160],
-                    source="facebook",
-                    source_id=fbid,
-                    source_url=p.get("permalink_url") or "",
-                )
-                if pic and not o["no_images"]:
-                    try:
-                        req = urllib.request.Request(pic, headers={"User-Agent": "civicblogs-import"})
-                        with urllib.request.urlopen(req, timeout=60) as r:
-                            blob = r.read()
-                        post.featured_image.save("fb_%s.jpg" % fbid.split("_")[-1],
-                                                 ContentFile(blob), save=True)
-                        post.featured_image_alt = title[:200]
-                        post.save(update_fields=["featured_image_alt"])
-                    except Exception as e:
-                        self.stdout.write(self.style.WARNING(
-                            "      โหลดรูปไม่สำเร็จ: %s" % str(e)[:80]))
+            report["created"] += 1
+            rows.append({
+                "fbid": fbid, "title": title, "message": message, "is_video": is_video,
+                "ptype": ptype, "cat": cat, "status": row_status,
+                "published_at": published_at, "permalink": p.get("permalink_url") or "",
+                "pic": None if o["no_images"] else pic,
+            })
+
+        if not o["dry_run"]:
+            # ---- เขียน: รูปถูกโหลดล่วงหน้าพร้อมกันหลายรูป transaction ไม่ต้องรอเน็ต ----
+            for row, blob, err in fetcher.fetch_ordered(rows, lambda r: r["pic"]):
+                self._write(row, self.author, blob, err)
+            report["written"] += len(rows)
+        return last, done
+
+    def print_report(self, o, client, fetcher):
+        report = self.report
+        self.stdout.write("\n" + client.summary())
+        if report["written"]:
+            self.stdout.write("\n" + fetcher.summary())
+            secs = time.monotonic() - report["started"]
+            self.stdout.write("เขียน %d รายการใน %.1f วินาที — %.1f โพสต์/วินาที" % (
+                report["written"], secs, report["written"] / (secs or 1e-9)))
 
         # ---- สรุป ----
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS(
             "%s %d โพสต์ | ข้ามเพราะมีอยู่แล้ว %d | ข้ามเพราะไม่มีข้อความ %d"
-            % ("จะนำเข้า" if dry else "นำเข้าแล้ว", created, skipped, empty)))
+            % ("จะนำเข้า" if o["dry_run"] else "นำเข้าแล้ว",
+               report["created"], report["skipped"], report["empty"])))
+        if report["near_skipped"]:
+            self.stdout.write(self.style.WARNING(
+                "ข้ามเพราะข้อความเกือบซ้ำกับที่มีอยู่ %d โพสต์" % report["near_skipped"]))
 
+        near_duplicates = report["near_duplicates"]
+        if near_duplicates:
+            self.stdout.write(self.style.WARNING(
+                "\nข้อความเกือบซ้ำกับที่มีอยู่ %d โพสต์ (นำเข้าเป็น draft ตรวจก่อนเผยแพร่):"
+                % len(near_duplicates)))
+            for t, other, d in near_duplicates[:8]:
+                self.stdout.write("   – %s  ≈ %s (ต่าง %d บิต)" % (t, other, d))
+
+        no_category = report["no_category"]
         if no_category:
             self.stdout.write(self.style.WARNING(
                 "\nจับคู่ประเด็นไม่ได้ %d โพสต์ (ใส่ 'อื่นๆ' ไว้ก่อน ควรมาจัดใหม่):" % len(no_category)))
             for t in no_category[:8]:
                 self.stdout.write("   – %s" % t)
 
-        if forced_draft:
+        if report["forced_draft"]:
             self.stdout.write(self.style.WARNING(
-                "\nบังคับเป็น draft %d โพสต์ (ไม่มี category)" % len(forced_draft)))
+                "\nบังคับเป็น draft %d โพสต์ (ไม่มี category)" % len(report["forced_draft"])))
             self.stdout.write(
                 "   หน้าเว็บอ่าน category.name โดยไม่กัน null — โพสต์ published ที่ไม่มี")
             self.stdout.write(
                 "   category จะทำให้หน้าแรกพังทั้งหน้า เลือก category แล้วค่อยเผยแพร่")
 
+        quote_titles = report["quote_titles"]
         if quote_titles:
             self.stdout.write(self.style.WARNING(
                 "\n⚠️  หัวข้อที่ขึ้นต้นด้วยเครื่องหมายคำพูด %d โพสต์" % len(quote_titles)))
@@ -408,5 +748,54 @@ class Command(BaseCommand):
             for t in quote_titles[:8]:
                 self.stdout.write("   – %s" % t)
 
-        if no_image:
-            self.stdout.write("\nไม่มีรูปให้ใช้ %d โพสต์" % no_image)
+        if report["no_image"]:
+            self.stdout.write("\nไม่มีรูปให้ใช้ %d โพสต์" % report["no_image"])
+
+    def _write(self, row, author, blob, err):
+        fbid, title = row["fbid"], row["title"]
+        if err is not None:
+            self.stdout.write(self.style.WARNING(
+                "      โหลดรูปไม่สำเร็จ (%s): %s" % (title[:30], str(err)[:80])))
+
+        if row["is_video"]:
+            with transaction.atomic():
+                obj = Video.objects.create(
+                    title=title[:200],
+                    description=to_html(row["message"]),
+                    video_url=row["permalink"],
+                    category=row["cat"],
+                    author=author,
+                    status=row["status"],
+                    published_at=row["published_at"],
+                    thumbnail_alt=title[:200],
+                    source="facebook",
+                    source_id=fbid,
+                )
+            image_field = "thumbnail"
+        else:
+            with transaction.atomic():
+                obj = Post.objects.create(
+                    title=title[:200],
+                    author=author,
+                    category=row["cat"],
+                    post_type=row["ptype"],
+                    content=to_html(row["message"]),
+                    status=row["status"],
+                    published_at=row["published_at"],
+                    meta_description=first_line(row["message"])[:160],
+                    featured_image_alt=title[:200] if blob else "",
+                    source="facebook",
+                    source_id=fbid,
+                    source_url=row["permalink"],
+                )
+            image_field = "featured_image"
+
+        if blob:
+            try:
+                # รูปที่ Facebook ส่งซ้ำ (โพสต์ซ้ำ, นำเข้าใหม่) ชี้ไฟล์เดิม ไม่เขียนซ้ำ
+                with media_store.stored(blob) as name:
+                    getattr(obj, image_field).name = name
+                    obj.save(update_fields=[image_field])
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(
+                    "      บันทึกรูปไม่สำเร็จ: %s" % str(e)[:80]))
@@ -8,14 +8,14 @@
 คำสั่งนี้แก้ย้อนหลังให้ครั้งเดียว หลังจากนี้ import_facebook_posts
 จะแยกปลายทางเองตาม media_type ที่ Graph API บอก
 
-รูปหน้าปกถูก "คัดลอก" ไป blog/video_thumbnails/ ไม่ใช่แค่ชี้ path เดิม
-เพื่อไม่ให้วิดีโอพังถ้าวันหลังมีคนล้างไฟล์กำพร้าใน featured_images/
+รูปหน้าปกใช้ไฟล์เดียวกันผ่าน blog/media_store.py (นับการอ้างอิง ลบ Post แล้วไฟล์ยังอยู่)
+รูปชื่อแบบเก่าใน featured_images/ ถูกอ่านครั้งเดียวแล้วย้ายเข้า media_store
 """
 
-from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from blog import media_store
 from blog.models import Post, Video
 
 REEL_MARKERS = ("/reel/", "/videos/", "/watch")
@@ -66,14 +66,20 @@ class Command(BaseCommand):
                     source="facebook",
                     source_id=p.source_id,
                 )
-                # คัดลอกไฟล์รูป ไม่ใช่ชี้ path เดิม
+                # รูปใน media_store ชี้ชื่อเดิมได้เลย ไม่ต้องดาวน์โหลด/อัปโหลดใหม่
                 if p.featured_image:
                     try:
-                        p.featured_image.open("rb")
-                        data = p.featured_image.read()
-                        p.featured_image.close()
-                        v.thumbnail.save(p.featured_image.name.split("/")[-1],
-                                         ContentFile(data), save=True)
+                        name = p.featured_image.name
+                        if media_store.is_stored(name):
+                            v.thumbnail.name = name
+                            v.save(update_fields=["thumbnail"])
+                        else:
+                            p.featured_image.open("rb")
+                            data = p.featured_image.read()
+                            p.featured_image.close()
+                            with media_store.stored(data) as name:
+                                v.thumbnail.name = name
+                                v.save(update_fields=["thumbnail"])
                     except Exception as e:
                         no_thumb += 1
                         self.stdout.write(self.style.WARNING(
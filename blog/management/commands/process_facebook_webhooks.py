@@ -0,0 +1,107 @@
+"""นำเข้าโพสต์ที่ webhook ของเพจแจ้งไว้ในคิว (PendingImport, blog/webhooks.py)
+
+    python manage.py process_facebook_webhooks --daemon --interval 30 --status published
+
+ขอเฉพาะโพสต์ที่อยู่ในคิวจาก Graph ทีละ BATCH_SIZE id (?ids=) แทนการไล่หน้าเพจ
+แล้วแปลงเป็น Post/Video ด้วยขั้นตอนเดียวกับ import_facebook_posts ทุกอย่าง
+(หัวข้อ, HTML, post type, category, โพสต์ซ้ำ, รูปหน้าปก) ตัวเลือกจึงเหมือนกัน
+
+- นำเข้าแล้ว หรือมีอยู่แล้ว -> ลบออกจากคิว (โพสต์ที่ "edited" แต่มีอยู่แล้วจะไม่ถูกแก้ทับ)
+- โพสต์ถูกลบไปก่อนได้ดึง -> ลบออกจากคิว
+- ดึงไม่สำเร็จ -> นับ attempts เก็บ last_error ไว้ลองรอบหน้า จนครบ --max-attempts
+
+ไม่ขยับ ImportCursor ของ import_facebook_posts เพราะ webhook มาไม่เรียงเวลา
+cron ตัวเดิมจึงยังเก็บตกโพสต์ที่ webhook พลาดได้ (ใช้ lease คนละชื่อ รันพร้อมกันได้)
+"""
+
+from django.core.management.base import CommandError
+from django.db.models import F
+
+from blog.graph_client import GraphError
+from blog.models import PendingImport
+
+from .import_facebook_posts import FIELDS, TOKEN_ERROR, Command as ImportCommand
+
+BATCH_SIZE = 50  # จำนวน id สูงสุดต่อ request ของ Graph
+NOT_FOUND = 100
+
+
+class Command(ImportCommand):
+    help = "นำเข้าโพสต์ที่ webhook ของเพจ Facebook แจ้งไว้ในคิว"
+
+    def add_arguments(self, p):
+        super().add_arguments(p)
+        p.add_argument("--max-attempts", type=int, default=5,
+                       help="ดึงไม่สำเร็จกี่ครั้งแล้วเลิกลอง (แถวยังอยู่ในคิวให้ตรวจดู)")
+        p.set_defaults(interval=30)
+
+    def lease_name(self, page_id):
+        return "facebook-webhook:%s" % page_id
+
+    def run_once(self, o, client, fetcher, page_id, token):
+        pending = list(PendingImport.objects.filter(page_id=page_id, attempts__lt=o["max_attempts"])
+                       .values_list("source_id", flat=True))
+        stuck = PendingImport.objects.filter(page_id=page_id, attempts__gte=o["max_attempts"]).count()
+        if stuck:
+            self.stdout.write(self.style.WARNING(
+                "ดึงไม่สำเร็จครบ %d ครั้งแล้ว %d โพสต์ (ดู PendingImport.last_error)" % (
+                    o["max_attempts"], stuck)))
+        if not pending:
+            self.stdout.write("ไม่มีโพสต์ในคิว")
+            return
+
+        self.prepare(o)
+        self.dry_run = o["dry_run"]
+        self.stdout.write("คิว webhook เพจ %s: %d โพสต์%s" % (
+            page_id, len(pending), self.style.WARNING("  [DRY RUN]") if o["dry_run"] else ""))
+        gone = []
+        for start in range(0, len(pending), BATCH_SIZE):
+            ids = pending[start:start + BATCH_SIZE]
+            posts, missing = self.fetch_posts(client, ids, token)
+            gone += missing
+            batch = sorted(posts, key=lambda p: p.get("created_time") or "")
+            last, done = self.import_batch(batch, o, fetcher)
+            if not o["dry_run"]:
+                handled = batch[:batch.index(last) + 1] if last is not None else []
+                PendingImport.objects.filter(
+                    source_id__in=[p["id"] for p in handled] + missing).delete()
+                self.renew_lease()
+            if done:
+                break
+
+        if gone:
+            self.stdout.write("โพสต์ถูกลบก่อนได้ดึง %d โพสต์" % len(gone))
+        if self.report["seen"]:
+            self.print_report(o, client, fetcher)
+
+    def fetch_posts(self, client, ids, token):
+        """(โพสต์ที่ดึงได้, id ที่ไม่มีอยู่แล้ว)
+
+        Graph ตอบ error ทั้งชุดถ้ามี id ไหนไม่มีอยู่ จึงถอยไปขอทีละ id เพื่อแยกตัวที่หายไป
+        """
+        try:
+            return list(self._lookup(client, ids, token).values()), []
+        except GraphError as e:
+            if e.code == TOKEN_ERROR:
+                raise CommandError("ดึงโพสต์ไม่สำเร็จ: %s" % str(e)[:200]) from e
+            if e.code != NOT_FOUND:
+                self._failed(ids, e)
+                return [], []
+            if len(ids) == 1:
+                return [], ids
+        posts, missing = [], []
+        for post_id in ids:
+            found, gone = self.fetch_posts(client, [post_id], token)
+            posts += found
+            missing += gone
+        return posts, missing
+
+    def _lookup(self, client, ids, token):
+        return client.get("", params={"ids": ",".join(ids), "fields": FIELDS, "access_token": token})
+
+    def _failed(self, ids, error):
+        self.stdout.write(self.style.WARNING(
+            "ดึง %d โพสต์ไม่สำเร็จ: %s" % (len(ids), str(error)[:200])))
+        if not self.dry_run:
+            PendingImport.objects.filter(source_id__in=ids).update(
+                attempts=F("attempts") + 1, last_error=str(error)[:1000])
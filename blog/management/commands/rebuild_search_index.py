@@ -0,0 +1,25 @@
+"""สร้าง index ของระบบค้นหาใหม่ทั้งหมด
+
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --kind post
+
+ปกติ index อัปเดตเองตอนบันทึก (blog/signals.py) ใช้คำสั่งนี้ครั้งแรกหลัง migrate
+หรือหลังแก้พจนานุกรม blog/data/thai_words.txt
+"""
+
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = "สร้าง index ของระบบค้นหาใหม่ทั้งหมด"
+
+    def add_arguments(self, p):
+        p.add_argument("--kind", action="append", choices=list(search.INDEXED_KINDS),
+                       help="เฉพาะประเภทนี้ (ใส่ซ้ำได้)")
+
+    def handle(self, *a, **o):
+        done = search.rebuild(o["kind"])
+        for kind, n in done.items():
+            self.stdout.write(self.style.SUCCESS("%s: %d รายการ" % (kind, n)))
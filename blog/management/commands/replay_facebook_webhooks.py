@@ -0,0 +1,81 @@
+"""เล่น webhook ของเพจ Facebook ซ้ำ — ทดสอบ/แก้ปัญหาโดยไม่ต้องรอ Facebook ส่งจริง
+
+    python manage.py replay_facebook_webhooks var/webhooks/            # ไฟล์ที่บันทึกไว้ (FACEBOOK_WEBHOOK_RECORD_DIR)
+    python manage.py replay_facebook_webhooks events.jsonl --url http://127.0.0.1:8000/api/v1/webhooks/facebook/
+
+รับได้ทั้งไดเรกทอรี, ไฟล์ .json (payload เดียว) และ .jsonl (บรรทัดละ payload)
+เซ็นด้วย FACEBOOK_APP_SECRET (หรือ --secret) เหมือน Facebook ทุกประการ
+ไม่ใส่ --url จะเรียก view ใน process นี้เลย ไม่ต้องเปิด server
+"""
+
+import json
+import os
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from blog import webhooks
+
+
+def iter_payloads(paths):
+    """body (bytes) ของ payload ตามลำดับชื่อไฟล์"""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from iter_payloads(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith((".json", ".jsonl"))))
+            continue
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise CommandError("อ่าน %s ไม่ได้: %s" % (path, e))
+        if path.endswith(".jsonl"):
+            yield from (line for line in data.splitlines() if line.strip())
+        else:
+            yield data
+
+
+class Command(BaseCommand):
+    help = "ส่ง webhook ของเพจ Facebook ที่บันทึกไว้ซ้ำ (เซ็นลายเซ็นให้)"
+
+    def add_arguments(self, p):
+        p.add_argument("paths", nargs="+", help="ไฟล์ .json / .jsonl หรือไดเรกทอรี")
+        p.add_argument("--url", help="URL ของ webhook (ไม่ใส่ = เรียก view ใน process นี้)")
+        p.add_argument("--secret", help="app secret สำหรับเซ็น (ค่าเริ่มต้น FACEBOOK_APP_SECRET)")
+
+    def handle(self, *a, **o):
+        secret = o["secret"] or settings.FACEBOOK_APP_SECRET
+        if not secret:
+            raise CommandError("ไม่มี app secret — ตั้ง FACEBOOK_APP_SECRET หรือใส่ --secret")
+
+        sent = failed = 0
+        with httpx.Client(timeout=30) as client:
+            for body in iter_payloads(o["paths"]):
+                try:
+                    json.loads(body)
+                except ValueError:
+                    self.stdout.write(self.style.WARNING("ข้าม payload ที่ไม่ใช่ JSON: %r" % body[:60]))
+                    failed += 1
+                    continue
+                headers = {webhooks.SIGNATURE_HEADER: webhooks.sign(body, secret)}
+                if o["url"]:
+                    r = client.post(o["url"], content=body,
+                                    headers=dict(headers, **{"Content-Type": "application/json"}))
+                    status, text = r.status_code, r.text
+                else:
+                    request = RequestFactory().post(
+                        "/", data=body, content_type="application/json",
+                        HTTP_X_HUB_SIGNATURE_256=headers[webhooks.SIGNATURE_HEADER])
+                    r = webhooks.facebook(request)
+                    status, text = r.status_code, r.content.decode()
+                if status == 200:
+                    sent += 1
+                    self.stdout.write("  %s" % text)
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING("  HTTP %d %s" % (status, text[:200])))
+
+        self.stdout.write(self.style.SUCCESS("ส่งสำเร็จ %d | ล้มเหลว %d" % (sent, failed)))
@@ -0,0 +1,33 @@
+"""ลบรูปใน media_store ที่ไม่มีแถวไหนอ้างอิงแล้ว (MediaBlob.ref_count = 0)
+
+    python manage.py sweep_media_blobs --older-than 24
+    python manage.py sweep_media_blobs --dry-run
+
+ปกติ release() ลบให้ทันทีที่การอ้างอิงสุดท้ายหายไป แถวที่ ref_count = 0 ค้างอยู่มาจาก
+store() รุ่นก่อนที่ไม่ได้ถือการอ้างอิง (บันทึกแถวล้มเหลวหลังเขียนไฟล์แล้ว)
+ข้ามแถวที่ใหม่กว่า --older-than ชั่วโมง ตั้ง cron วันละครั้งได้
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog import media_store
+
+
+class Command(BaseCommand):
+    help = "ลบรูปใน media_store ที่ไม่มีใครอ้างอิงแล้ว"
+
+    def add_arguments(self, p):
+        p.add_argument("--older-than", type=float, default=24, metavar="HOURS",
+                       help="ลบเฉพาะ blob ที่สร้างก่อนกี่ชั่วโมง (ค่าเริ่มต้น 24)")
+        p.add_argument("--dry-run", action="store_true", help="แสดงรายการโดยไม่ลบ")
+
+    def handle(self, *a, **o):
+        cutoff = timezone.now() - timedelta(hours=o["older_than"])
+        names = media_store.sweep(cutoff, dry_run=o["dry_run"])
+        for name in names:
+            self.stdout.write("  %s" % name)
+        self.stdout.write(self.style.SUCCESS("%s %d ไฟล์" % (
+            "จะลบ" if o["dry_run"] else "ลบแล้ว", len(names))))
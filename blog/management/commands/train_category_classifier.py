@@ -0,0 +1,51 @@
+"""เทรนตัวจัด Category (blog/category_classifier.py) จากโพสต์ที่มีหมวดแล้ว
+
+    python manage.py train_category_classifier
+    python manage.py train_category_classifier --threshold 0.6 --output /tmp/model.npz
+
+บันทึกไปที่ settings.CATEGORY_MODEL_PATH — import_facebook_posts ใช้ไฟล์นี้ถ้ามี
+ไม่มีก็กลับไปใช้ CATEGORY_KEYWORDS แบบเดิม
+ควรเทรนใหม่หลังทีมจัดหมวดโพสต์เพิ่มหรือเพิ่มหมวดใหม่
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.category_classifier import (DEFAULT_THRESHOLD, MAX_FEATURES, CategoryClassifier,
+                                      labelled_examples, model_path)
+from blog.management.commands.import_facebook_posts import FALLBACK_CATEGORY
+
+
+class Command(BaseCommand):
+    help = "เทรนตัวจัด Category จาก Post/Video ที่คนจัดหมวดไว้แล้ว"
+
+    def add_arguments(self, p):
+        p.add_argument("--output", help="path ของไฟล์ model (ค่าเริ่มต้น CATEGORY_MODEL_PATH)")
+        p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="confidence ต่ำกว่านี้ใช้ '%s' (ค่าเริ่มต้น %.2f)"
+                            % (FALLBACK_CATEGORY, DEFAULT_THRESHOLD))
+        p.add_argument("--max-features", type=int, default=MAX_FEATURES)
+        p.add_argument("--include-fallback", action="store_true",
+                       help="เทรนหมวด '%s' ด้วย (ปกติข้าม เพราะเป็นที่รวมโพสต์ที่จับคู่ไม่ได้)"
+                            % FALLBACK_CATEGORY)
+
+    def handle(self, *a, **o):
+        path = o["output"] or model_path()
+        if not path:
+            raise CommandError("ไม่ได้ตั้ง CATEGORY_MODEL_PATH และไม่ได้ใส่ --output")
+
+        exclude = () if o["include_fallback"] else (FALLBACK_CATEGORY,)
+        rows = labelled_examples(exclude=exclude)
+        if len({label for _, label, _ in rows}) < 2:
+            raise CommandError("ต้องมีโพสต์ที่จัดหมวดแล้วอย่างน้อย 2 หมวด (มี %d โพสต์)" % len(rows))
+
+        model = CategoryClassifier.train([t for t, _, _ in rows], [label for _, label, _ in rows],
+                                         max_features=o["max_features"], threshold=o["threshold"])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        model.save(path)
+
+        self.stdout.write("เทรนจาก %d โพสต์ | %d หมวด | %d feature"
+                          % (len(rows), len(model.classes), len(model.vocab)))
+        self.stdout.write(self.style.SUCCESS("บันทึก model แล้ว: %s (%.0f KB)"
+                                             % (path, os.path.getsize(path) / 1024)))
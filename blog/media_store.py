@@ -0,0 +1,128 @@
+"""ที่เก็บรูปแบบ content-addressed สำหรับ Post.featured_image และ Video.thumbnail
+
+เดิมตัวนำเข้าเขียนไฟล์ใหม่ (fb_<id>.jpg) ทุกโพสต์ แม้ Facebook ส่งรูปเดิมซ้ำ
+และ move_reels_to_video ต้องดาวน์โหลดรูปแล้วอัปโหลดกลับเพื่อคัดลอกไปเป็น thumbnail
+
+ที่นี่ชื่อไฟล์คือ SHA-256 ของเนื้อไฟล์ (blog/media/sha256/ab/cd/<hash>.jpg)
+รูปเดียวกันจึงเขียนลง storage ครั้งเดียว แถวอื่นแค่ชี้ชื่อเดิม
+MediaBlob.ref_count นับจำนวน field ที่ชี้อยู่ — signals.py เพิ่ม/ลดให้เมื่อบันทึกหรือลบ
+Post/Video และลบไฟล์ทิ้งเมื่อไม่มีใครใช้แล้ว
+
+    with media_store.stored(blob) as name:
+        obj.featured_image.name = name
+        obj.save(update_fields=['featured_image'])
+
+blob ที่ ref_count = 0 ค้างเก่า ๆ เก็บกวาดด้วย python manage.py sweep_media_blobs
+
+ไฟล์ชื่อแบบเดิม (upload_to) ไม่ถูกนับและไม่ถูกลบโดยโมดูลนี้
+"""
+
+import hashlib
+import logging
+from contextlib import contextmanager
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import MEDIA_STORE_PREFIX as PREFIX, MediaBlob
+
+logger = logging.getLogger(__name__)
+
+
+def digest_of(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def name_for(digest, ext='jpg'):
+    return f'{PREFIX}{digest[:2]}/{digest[2:4]}/{digest}.{ext}'
+
+
+def is_stored(name):
+    """True ถ้าชื่อไฟล์นี้อยู่ในที่เก็บแบบ content-addressed"""
+    return isinstance(name, str) and name.startswith(PREFIX)
+
+
+def store(data, ext='jpg'):
+    """ชื่อไฟล์ของ ``data`` ใน storage — เขียนไฟล์เฉพาะเมื่อยังไม่เคยมีเนื้อเดียวกัน
+
+    คืนชื่อพร้อมการอ้างอิงหนึ่งครั้งที่ถือไว้ให้ผู้เรียก (ref_count + 1 ใน UPDATE เดียวกับที่หาแถว)
+    release() ที่เกิดพร้อมกันจึงลบไฟล์ไปก่อนแถวที่จะชี้ชื่อนี้ถูกบันทึกไม่ได้
+    ผู้เรียกต้อง release(name) หลังบันทึกแถวเสร็จ (หรือล้มเหลว) — ใช้ผ่าน stored() สะดวกกว่า
+    """
+    digest = digest_of(data)
+    if MediaBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1):
+        # ถือการอ้างอิงอยู่แล้ว แถวนี้ถูกลบไม่ได้จนกว่าจะ release
+        return MediaBlob.objects.filter(sha256=digest).values_list('name', flat=True).get()
+
+    name = name_for(digest, ext)
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(data))
+        if saved != name:
+            # อีก process เขียนชื่อเดียวกันไปก่อนแล้ว — เนื้อไฟล์เหมือนกัน ทิ้งของเรา
+            default_storage.delete(saved)
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(sha256=digest, name=name, size=len(data), ref_count=1)
+    except IntegrityError:
+        # อีก process สร้างแถวไปพร้อมกัน — ถือการอ้างอิงของแถวนั้นแทน
+        return store(data, ext)
+    return name
+
+
+@contextmanager
+def stored(data, ext='jpg'):
+    """store() แล้วคืนการอ้างอิงที่ถือไว้เมื่อจบ block — บันทึกแถวที่ชี้ชื่อนี้ภายใน block
+
+    แถวที่บันทึกสำเร็จถูกนับโดย signals.py ส่วนถ้าบันทึกล้มเหลว ไม่เหลือใครอ้างอิง
+    แถวและไฟล์ถูกลบทันที ไม่ค้างเป็นขยะ
+    """
+    name = store(data, ext)
+    try:
+        yield name
+    finally:
+        release(name)
+
+
+def retain(name):
+    if is_stored(name) and not MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        logger.warning('media_store: ไม่พบ %s ตอนเพิ่มการอ้างอิง (ใช้ชื่อนี้โดยไม่ผ่าน store())', name)
+
+
+def release(name):
+    """ลดการอ้างอิง ถ้าไม่เหลือแล้วลบทั้งแถวและไฟล์ใน storage"""
+    if not is_stored(name):
+        return
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    deleted, _ = MediaBlob.objects.filter(name=name, ref_count=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: _delete_if_unused(name))
+
+
+def sweep(older_than, dry_run=False):
+    """ลบ blob ที่ ref_count = 0 และสร้างก่อน older_than (datetime) — คืนรายชื่อที่ลบ
+
+    แถวแบบนี้มาจากก่อนที่ store() จะถือการอ้างอิง หรือ process ที่ตายกลางทาง
+    """
+    names = list(MediaBlob.objects.filter(ref_count=0, created_at__lt=older_than)
+                 .values_list('name', flat=True))
+    if dry_run:
+        return names
+    swept = []
+    for name in names:
+        with transaction.atomic():
+            # ล็อกแล้วตรวจซ้ำ — ระหว่างนี้อาจมีคน store() เนื้อเดียวกัน
+            blob = MediaBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+            if blob is None:
+                continue
+            blob.delete()
+            transaction.on_commit(lambda name=name: _delete_if_unused(name))
+        swept.append(name)
+    return swept
+
+
+def _delete_if_unused(name):
+    # ระหว่างรอ commit อาจมีคน store() เนื้อเดียวกันกลับมาใหม่
+    if not MediaBlob.objects.filter(name=name).exists():
+        default_storage.delete(name)
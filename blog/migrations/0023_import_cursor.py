@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0022_content_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='เช่น facebook:<page id>', max_length=100, unique=True)),
+                ('created_time', models.DateTimeField(blank=True, null=True)),
+                ('source_id', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
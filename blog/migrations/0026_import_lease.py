@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0025_simhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='เช่น facebook:<page id>', max_length=100, unique=True)),
+                ('holder', models.CharField(help_text='host:pid:สุ่ม ของผู้ถือ', max_length=200)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0026_import_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_id', models.CharField(help_text='id ของโพสต์ใน Facebook', max_length=100, unique=True)),
+                ('page_id', models.CharField(db_index=True, max_length=50)),
+                ('verb', models.CharField(blank=True, help_text='add / edited ตามที่ webhook แจ้ง', max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+            },
+        ),
+    ]
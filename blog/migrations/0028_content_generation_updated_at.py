@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0027_pending_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentgeneration',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -11,6 +11,8 @@ import re
 
 from django.utils.html import strip_tags
 
+from .simhash import simhash, to_signed
+
 # Get Azure Storage instance
 # def get_azure_storage():
 #     from django.conf import settings
@@ -18,7 +20,59 @@ from django.utils.html import strip_tags
 #     return get_storage_class(settings.DEFAULT_FILE_STORAGE)()
 
 
-class Category(models.Model):
+_NOT_LOADED = object()
+
+
+class FieldTrackerMixin:
+    """Remember field values as loaded from the database.
+
+    Models list the fields they care about in ``tracked_fields`` and call
+    ``field_changed(name)`` from ``save()`` to decide whether an expensive
+    hook (image re-encoding, index rebuild, ...) has to run.  File fields are
+    compared by name so a tracked image never has to be opened to find out.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _tracked_value(self, name):
+        # อ่านจาก __dict__ ตรง ๆ เพื่อไม่ให้ field ที่ defer ไว้ถูกโหลดเพิ่ม
+        field = self._meta.get_field(name)
+        value = self.__dict__.get(field.attname, _NOT_LOADED)
+        if isinstance(field, models.FileField) and value is not _NOT_LOADED:
+            return getattr(value, 'name', value) or ''
+        return value
+
+    def _snapshot_tracked_fields(self, update_fields=None):
+        # save(update_fields=...) เขียนลงฐานข้อมูลแค่บาง field ที่เหลือยังถือว่าค้างอยู่
+        loaded = getattr(self, '_loaded_values', None)
+        if update_fields is None or loaded is None:
+            loaded = {}
+            update_fields = self.tracked_fields
+        for name in self.tracked_fields:
+            if name in update_fields:
+                loaded[name] = self._tracked_value(name)
+        self._loaded_values = loaded
+
+    def field_changed(self, name):
+        """True ถ้าค่าของ field ต่างจากตอนโหลด (object ใหม่ถือว่าเปลี่ยนเสมอ)"""
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return True
+        current = self._tracked_value(name)
+        if current is _NOT_LOADED:
+            return False
+        return loaded.get(name, _NOT_LOADED) != current
+
+    def changed_fields(self):
+        return {name for name in self.tracked_fields if self.field_changed(name)}
+
+
+class Category(FieldTrackerMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
@@ -28,6 +82,9 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'
         ordering = ['name']
     
+    # ชื่ออยู่ใน search index ของเนื้อหาในหมวด (signals.reindex_category_contents)
+    tracked_fields = ('name',)
+    
     def __str__(self):
         return self.name
     
@@ -35,6 +92,7 @@ class Category(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
     
     def get_absolute_url(self):
         return reverse('blog:category_detail', kwargs={'slug': self.slug})
@@ -63,6 +121,43 @@ class PostType(models.Model):
         super().save(*args, **kwargs)
 
 
+EXCERPT_LENGTH = 150
+
+
+def html_to_plain_text(content):
+    """HTML จาก CKEditor -> ข้อความล้วน ช่องว่างติดกันยุบเหลือช่องเดียว"""
+    return re.sub(r'\s+', ' ', strip_tags(content or '')).strip()
+
+
+def make_excerpt(plain_text):
+    """Generate excerpt from plain text"""
+    # Get first 150 characters for excerpt
+    if len(plain_text) > EXCERPT_LENGTH:
+        # Try to break at sentence end
+        excerpt = plain_text[:EXCERPT_LENGTH]
+        last_sentence = excerpt.rfind('.')
+        last_space = excerpt.rfind(' ')
+
+        if last_sentence > 100:
+            return excerpt[:last_sentence + 1]
+        elif last_space > 100:
+            return excerpt[:last_space] + '...'
+        else:
+            return excerpt + '...'
+
+    return plain_text
+
+
+def text_simhash(plain_text):
+    """SimHash แบบ signed 64 บิตสำหรับเก็บใน BigIntegerField"""
+    return to_signed(simhash(plain_text))
+
+
+def estimate_reading_time(plain_text):
+    word_count = len(plain_text.split())
+    return max(1, round(word_count / 200))
+
+
 def upload_featured_image(instance, filename):
     ext = filename.split('.')[-1]
     filename = f'{uuid.uuid4()}.{ext}'
@@ -75,7 +170,18 @@ def upload_video_thumbnail(instance, filename):
     return os.path.join('blog/video_thumbnails', filename)
 
 
-class Post(models.Model):
+# รูปใน blog/media_store.py — ชื่อไฟล์คือ hash ของเนื้อไฟล์ ห้ามแก้เนื้อไฟล์ทีหลัง
+# และอาจมีหลายแถวใช้ร่วมกัน จึงไม่ encode ซ้ำตอน save
+MEDIA_STORE_PREFIX = 'blog/media/sha256/'
+
+# field ที่ refresh_derived_text() เขียน
+DERIVED_TEXT_FIELDS = ('plain_text', 'excerpt', 'reading_time', 'simhash')
+
+# field หนัก ๆ ที่หน้า list ไม่ใช้ — ใช้กับ .defer()
+LIST_DEFERRED_FIELDS = ('content', 'plain_text')
+
+
+class Post(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('published', 'Published'),
@@ -104,6 +210,13 @@ class Post(models.Model):
     
     # Analytics
     view_count = models.PositiveIntegerField(default=0)
+
+    # คำนวณจาก content ตอนบันทึก (refresh_derived_text) — หน้า list ไม่ต้องโหลด content ทั้งก้อน
+    excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    plain_text = models.TextField(blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
+    # SimHash ของ plain_text สำหรับหาโพสต์ที่เกือบซ้ำ (blog/simhash.py)
+    simhash = models.BigIntegerField(null=True, blank=True, editable=False)
     
 
     # ที่มาของโพสต์ — ใช้เมื่อนำเข้าอัตโนมัติจากแพลตฟอร์มอื่น (เช่น เพจ Facebook)
@@ -131,12 +244,29 @@ class Post(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['category']),
             models.Index(fields=['source']),
+            # keyset pagination (blog/pagination.py)
+            models.Index(fields=['status', '-created_at', '-id']),
+            models.Index(fields=['status', '-view_count', '-id']),
         ]
     
+    tracked_fields = ('featured_image', 'content', 'title', 'status', 'category')
+
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
+        # ตัดสินใจก่อน super().save() เพราะหลังบันทึก snapshot จะถูกรีเซ็ต
+        update_fields = kwargs.get('update_fields')
+        optimize_image = bool(self.featured_image) and self.field_changed('featured_image') and (
+            update_fields is None or 'featured_image' in update_fields
+        ) and not self.featured_image.name.startswith(MEDIA_STORE_PREFIX)
+
+        if update_fields is None or 'content' in update_fields:
+            if self.field_changed('content') or not self.reading_time:
+                self.refresh_derived_text()
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | set(DERIVED_TEXT_FIELDS)
+
         if not self.slug:
             # For Thai text, create a simple slug from title
             import re
@@ -165,9 +295,12 @@ class Post(models.Model):
             self.slug = slug
         
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
         
         # Optimize image for both local and cloud storage
-        if self.featured_image:
+        # ข้ามเมื่อรูปไม่ได้เปลี่ยน เช่น save(update_fields=['view_count']) ทุกครั้งที่มีคนเปิดอ่าน
+        # ไม่งั้นต้องดึง blob จาก Azure มา encode ใหม่ทุก request
+        if optimize_image:
             try:
                 from django.core.files.storage import default_storage
                 from django.core.files.base import ContentFile
@@ -224,38 +357,26 @@ class Post(models.Model):
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'slug': self.slug})
     
+    def refresh_derived_text(self):
+        """คำนวณ plain_text / excerpt / reading_time จาก content ใหม่"""
+        self.plain_text = html_to_plain_text(self.content)
+        self.excerpt = make_excerpt(self.plain_text)
+        self.reading_time = estimate_reading_time(self.plain_text)
+        self.simhash = text_simhash(self.plain_text)
+
     def get_reading_time(self):
-        # Strip HTML tags for word count
-        plain_text = strip_tags(self.content)
-        word_count = len(plain_text.split())
-        return max(1, round(word_count / 200))
+        if self.reading_time:
+            return self.reading_time
+        return estimate_reading_time(html_to_plain_text(self.content))
     
     def get_excerpt(self):
-        """Generate excerpt automatically from content"""
-        # Remove HTML tags
-        plain_text = strip_tags(self.content)
-        
-        # Clean up text
-        plain_text = re.sub(r'\s+', ' ', plain_text).strip()
-        
-        # Get first 150 characters for excerpt
-        if len(plain_text) > 150:
-            # Try to break at sentence end
-            excerpt = plain_text[:150]
-            last_sentence = excerpt.rfind('.')
-            last_space = excerpt.rfind(' ')
-            
-            if last_sentence > 100:
-                return excerpt[:last_sentence + 1]
-            elif last_space > 100:
-                return excerpt[:last_space] + '...'
-            else:
-                return excerpt + '...'
-        
-        return plain_text
+        """Excerpt stored at save time; computed from content for rows not yet backfilled"""
+        if self.excerpt:
+            return self.excerpt
+        return make_excerpt(html_to_plain_text(self.content))
 
 
-class Video(models.Model):
+class Video(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('published', 'Published'),
@@ -280,6 +401,9 @@ class Video(models.Model):
     
     # Analytics
     view_count = models.PositiveIntegerField(default=0)
+
+    # SimHash ของคำอธิบาย สำหรับหาวิดีโอ/โพสต์ที่เกือบซ้ำ (blog/simhash.py)
+    simhash = models.BigIntegerField(null=True, blank=True, editable=False)
     
 
     # ที่มาของวิดีโอ — ใช้เมื่อนำเข้าอัตโนมัติจากเพจ Facebook
@@ -302,8 +426,13 @@ class Video(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['category']),
+            # keyset pagination (blog/pagination.py)
+            models.Index(fields=['status', '-created_at', '-id']),
+            models.Index(fields=['status', '-view_count', '-id']),
         ]
     
+    tracked_fields = ('thumbnail', 'title', 'description', 'status', 'category')
+
     def __str__(self):
         return self.title
     
@@ -334,8 +463,19 @@ class Video(models.Model):
                 counter += 1
             
             self.slug = slug
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'description' in update_fields:
+            if self.field_changed('description') or self.simhash is None:
+                self.refresh_simhash()
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'simhash'}
         
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
+
+    def refresh_simhash(self):
+        self.simhash = text_simhash(html_to_plain_text(self.description))
     
     def get_absolute_url(self):
         return reverse('blog:video_detail', kwargs={'slug': self.slug})
@@ -372,7 +512,7 @@ def upload_survey_file(instance, filename):
     return os.path.join('surveys/files', filename)
 
 
-class Survey(models.Model):
+class Survey(FieldTrackerMixin, models.Model):
     """แบบสำรวจและข้อมูลการสำรวจ (เอกสารที่สำรวจมาแล้ว)"""
 
     title = models.CharField('ชื่อแบบสำรวจ', max_length=200)
@@ -413,8 +553,13 @@ class Survey(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['is_published']),
             models.Index(fields=['slug']),
+            # keyset pagination (blog/pagination.py)
+            models.Index(fields=['is_published', '-created_at', '-id']),
+            models.Index(fields=['is_published', '-view_count', '-id']),
         ]
 
+    tracked_fields = ('survey_file', 'title', 'description', 'is_published', 'category')
+
     def __str__(self):
         return self.title
 
@@ -446,6 +591,125 @@ class Survey(models.Model):
             self.published_at = timezone.now()
 
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
 
     def get_absolute_url(self):
         return reverse('blog:survey_detail', kwargs={'slug': self.slug})
+
+
+class SearchDocument(models.Model):
+    """เอกสารหนึ่งชิ้นใน inverted index ของระบบค้นหา (blog/search.py)"""
+    KIND_CHOICES = (
+        ('post', 'Post'),
+        ('video', 'Video'),
+        ('survey', 'Survey'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField(default=0, help_text='จำนวน token ทั้งหมด (ใช้ใน BM25)')
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique_object'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+
+class SearchPosting(models.Model):
+    """term หนึ่งคำในเอกสารหนึ่งชิ้น พร้อมจำนวนครั้งที่พบ"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10)
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term']),
+        ]
+
+    def __str__(self):
+        return f'{self.term} ({self.frequency})'
+
+
+class ContentGeneration(models.Model):
+    """ตัวนับรุ่นของเนื้อหา ใช้เป็นส่วนหนึ่งของ key ใน cache ของ API (blog/api_cache.py)
+
+    เก็บในฐานข้อมูลเพื่อให้ทุก worker / ทุกเครื่อง รวมถึงคำสั่งนำเข้าที่รันจาก cron
+    เห็นค่าเดียวกัน — บวกหนึ่งเมื่อไหร่ cache เดิมทั้งหมดก็ใช้ไม่ได้ทันที
+    updated_at คือเวลาที่บวกล่าสุด ใช้เป็น Last-Modified ขั้นต่ำของ detail view (blog/conditional.py)
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}={self.value}'
+
+
+class ImportCursor(models.Model):
+    """ตำแหน่งล่าสุดที่ตัวนำเข้าไล่ถึงแล้ว (import_facebook_posts)
+
+    บันทึกหลังเขียนแต่ละหน้าของ Graph API เสร็จ cron รอบถัดไปจึงขอเฉพาะโพสต์
+    ที่ใหม่กว่า created_time นี้ แทนที่จะไล่ใหม่ตั้งแต่ --since ทุกครั้ง
+    """
+    name = models.CharField(max_length=100, unique=True, help_text='เช่น facebook:<page id>')
+    created_time = models.DateTimeField(null=True, blank=True)
+    source_id = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} @ {self.created_time} ({self.source_id})'
+
+
+class MediaBlob(models.Model):
+    """ไฟล์รูปใน storage ที่ตั้งชื่อตาม SHA-256 ของเนื้อไฟล์ (blog/media_store.py)
+
+    รูปเดียวกันเก็บครั้งเดียว Post.featured_image / Video.thumbnail หลายแถวชี้ชื่อเดียวกันได้
+    ref_count นับจำนวนแถวที่ชี้อยู่ — ลดเหลือ 0 แล้วไฟล์ถูกลบ
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True, help_text='path ใน storage')
+    size = models.PositiveIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count} refs)'
+
+
+class ImportLease(models.Model):
+    """สิทธิ์รันตัวนำเข้าแบบมีวันหมดอายุ — ให้ทำงานได้ทีละตัวแม้รันหลายเครื่อง
+
+    ผู้ถือต่ออายุเรื่อย ๆ ระหว่างทำงาน ถ้า process ตายไปเฉย ๆ lease หมดอายุเอง
+    แล้วตัวอื่นรับช่วงต่อได้ (import_facebook_posts --daemon)
+    """
+    name = models.CharField(max_length=100, unique=True, help_text='เช่น facebook:<page id>')
+    holder = models.CharField(max_length=200, help_text='host:pid:สุ่ม ของผู้ถือ')
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.name} -> {self.holder} (ถึง {self.expires_at})'
+
+
+class PendingImport(models.Model):
+    """โพสต์ที่ Facebook แจ้งผ่าน webhook ว่าเพิ่ม/แก้ไข รอ process_facebook_webhooks ดึงไปนำเข้า
+
+    webhook เก็บแค่ id ของโพสต์ (blog/webhooks.py) — ตัวประมวลผลขอเฉพาะโพสต์เหล่านี้จาก Graph
+    แทนการไล่หน้าเพจทั้งหน้า แจ้งซ้ำกี่ครั้งก็มีแถวเดียวต่อโพสต์
+    """
+    source_id = models.CharField(max_length=100, unique=True, help_text='id ของโพสต์ใน Facebook')
+    page_id = models.CharField(max_length=50, db_index=True)
+    verb = models.CharField(max_length=20, blank=True, help_text='add / edited ตามที่ webhook แจ้ง')
+    received_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+
+    def __str__(self):
+        return f'{self.source_id} ({self.verb}, ลอง {self.attempts} ครั้ง)'
@@ -0,0 +1,256 @@
+"""Keyset (cursor) pagination for the public list API.
+
+OFFSET pagination has to walk every skipped row, and the legacy
+``pagination_class = None`` endpoints dump the whole table.  Keyset
+pagination instead filters on the last row seen, e.g. for "latest"::
+
+    WHERE created_at < :c OR (created_at = :c AND id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT :n
+
+so every page costs the same no matter how deep into the archive it is.
+
+Cursor mode is opt-in per request so the Next.js frontend can move over one
+call at a time:
+
+- ``?paginate=cursor`` (or any ``?cursor=``) returns
+  ``{"next": url, "previous": url, "results": [...]}``
+- otherwise the endpoint keeps its legacy response shape
+
+Set ``API_KEYSET_PAGINATION_DEFAULT = True`` once the frontend has migrated;
+``?paginate=legacy`` then still reaches the old behaviour.
+
+Searches are ranked by relevance (``search_rank``), which has no keyset, so
+``?search=`` always gets the legacy shape: asking for cursor mode explicitly
+is a 400 instead of silently re-sorting the hits by date.
+
+``order=popular`` pages by ``view_count``, which changes while a client is
+paging (counts are flushed every VIEW_COUNT_FLUSH_INTERVAL).  A row whose
+count moves across the cursor between requests can be skipped or show up
+twice; use it for "browse the popular ones", not for walking every row.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .fieldsets import sparse_queryset
+
+# ชื่อที่ใช้ใน ?order= -> ลำดับการเรียง (field สุดท้ายต้อง unique เสมอ)
+# popular ไม่นิ่งระหว่างหน้า — ยอดวิวเปลี่ยนได้ระหว่างที่ client ไล่หน้า (ดู docstring ด้านบน)
+KEYSET_ORDERINGS = {
+    'latest': ('-created_at', '-id'),
+    'popular': ('-view_count', '-id'),
+}
+DEFAULT_ORDER = 'latest'
+
+
+def use_keyset(request):
+    """True ถ้า request นี้ต้องการผลแบบ cursor
+
+    ผลค้นหา (?search=) เรียงตามคะแนน ไม่มี keyset — ขอ cursor ตรง ๆ ได้ 400
+    ส่วนค่าเริ่มต้น API_KEYSET_PAGINATION_DEFAULT ไม่มีผลกับการค้นหา
+    """
+    params = request.query_params
+    mode = params.get('paginate')
+    if mode == 'legacy':
+        return False
+    explicit = mode == 'cursor' or 'cursor' in params
+    if params.get('search'):
+        if explicit:
+            raise ParseError('Cursor pagination is not available with search')
+        return False
+    return explicit or getattr(settings, 'API_KEYSET_PAGINATION_DEFAULT', False)
+
+
+def encode_cursor(order, values, reverse=False):
+    payload = {'o': order, 'v': [v.isoformat() if isinstance(v, datetime) else v for v in values]}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return payload['o'], list(payload['v']), bool(payload.get('r'))
+    except (TypeError, ValueError, KeyError):
+        raise NotFound('Invalid cursor')
+
+
+class KeysetPagination(BasePagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    order_query_param = 'order'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, orderings=None):
+        self.orderings = orderings or KEYSET_ORDERINGS
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_order(self, request):
+        order = request.query_params.get(self.order_query_param, DEFAULT_ORDER)
+        if order not in self.orderings:
+            order = DEFAULT_ORDER
+        return order
+
+    def _boundary(self, fields, values, reverse):
+        """Q ของแถวที่อยู่ "ถัดจาก" cursor ตามลำดับที่กำหนด"""
+        q = Q()
+        for i, field in enumerate(fields):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            step = Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): values[i]})
+            for prev, value in zip(fields[:i], values):
+                step &= Q(**{prev.lstrip('-'): value})
+            q |= step
+        return q
+
+    def _parse_values(self, queryset, fields, values):
+        """ค่าใน cursor -> ชนิดของ field — cursor ที่ถูกแก้หรือเสียได้ 404 ไม่ใช่ 500"""
+        model = queryset.model
+        parsed = []
+        for name, value in zip(fields, values):
+            field = model._meta.get_field(name.lstrip('-'))
+            try:
+                if field.get_internal_type() == 'DateTimeField':
+                    value = parse_datetime(value) if isinstance(value, str) else None
+                else:
+                    value = field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound('Invalid cursor')
+            if value is None:
+                raise NotFound('Invalid cursor')
+            parsed.append(value)
+        return parsed
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.order = self.get_order(request)
+        fields = self.orderings[self.order]
+        size = self.get_page_size(request)
+
+        reverse = False
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            order, values, reverse = decode_cursor(cursor)
+            if order != self.order or len(values) != len(fields):
+                raise NotFound('Invalid cursor')
+            values = self._parse_values(queryset, fields, values)
+            queryset = queryset.filter(self._boundary(fields, values, reverse))
+
+        ordering = fields
+        if reverse:
+            ordering = [f[1:] if f.startswith('-') else '-' + f for f in fields]
+        rows = list(queryset.order_by(*ordering)[:size + 1])
+
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        self.fields = fields
+        self.has_next = has_more if not reverse else True
+        self.has_previous = bool(cursor) and (has_more if reverse else True)
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        if not rows and cursor:
+            # หน้าว่างหลัง cursor: ย้อนกลับได้แต่ไปต่อไม่ได้
+            self.has_next, self.has_previous = reverse, not reverse
+        return rows
+
+    def _values(self, obj):
+        return [getattr(obj, f.lstrip('-')) for f in self.fields]
+
+    def _link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, 'paginate', 'cursor')
+        return replace_query_param(url, self.cursor_query_param,
+                                   encode_cursor(self.order, self._values(obj), reverse))
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self._link(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            # ไม่มีแถวให้อ้างอิง ชี้กลับไปหน้าแรก
+            url = remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+            return replace_query_param(url, 'paginate', 'cursor')
+        return self._link(self.first, reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetOrLegacyMixin:
+    """List views: keyset pagination on request, the old behaviour otherwise.
+
+    ``legacy_pagination_class`` is what the view used before (``None`` for a
+    plain list, or DRF's ``PageNumberPagination``).
+    """
+    legacy_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if use_keyset(self.request):
+                self._paginator = KeysetPagination()
+            elif self.legacy_pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.legacy_pagination_class()
+        return self._paginator
+
+
+def keyset_page(request, queryset, serializer_class, key, context=None):
+    """ใช้ใน function view ที่คืน {'category': ..., key: [...]}
+
+    คืน dict ที่มี key เดิม และเพิ่ม next/previous เมื่ออยู่ในโหมด cursor
+    """
+    if context is None:
+        context = {'request': request}
+    queryset = sparse_queryset(queryset, serializer_class, request)
+    if not use_keyset(request):
+        return {key: serializer_class(queryset, many=True, context=context).data}
+    paginator = KeysetPagination()
+    rows = paginator.paginate_queryset(queryset, request)
+    data = serializer_class(rows, many=True, context=context).data
+    return {key: data, 'next': paginator.get_next_link(), 'previous': paginator.get_previous_link()}
@@ -0,0 +1,159 @@
+"""ค้นหาเนื้อหาด้วย inverted index + BM25
+
+แทน ``content__icontains`` ซึ่งต้องสแกน HTML ทุกแถว และตัดคำไทยไม่ได้
+ข้อความของ Post / Video / Survey ที่เผยแพร่แล้วถูกตัดคำ (blog/thai_segmenter.py)
+แล้วเก็บเป็น SearchDocument + SearchPosting ตอนบันทึก (blog/signals.py)
+
+ตอนค้นหาอ่านเฉพาะ posting ของคำในคำค้น และให้ฐานข้อมูลทำ AND กับคิดคะแนนเอง
+(GROUP BY เอกสาร HAVING พบครบทุกคำ) ส่งกลับมาแค่ผลที่ต้องใช้ ไม่ดึง posting ทั้งหมด
+มาไล่ใน Python ใช้ ORM ล้วน ๆ จึงทำงานได้ทั้ง SQLite และ Postgres
+
+ทุกคำในคำค้นต้องพบในเอกสาร (AND) แล้วจัดอันดับด้วย BM25
+คำในหัวข้อมีน้ำหนัก TITLE_BOOST เท่า
+
+สร้าง index ทั้งหมดใหม่: python manage.py rebuild_search_index
+"""
+
+import math
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, FloatField, IntegerField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Post, SearchDocument, SearchPosting, Survey, Video, html_to_plain_text
+from .thai_segmenter import tokenize
+
+K1 = 1.2
+B = 0.75
+TITLE_BOOST = 3
+MAX_RESULTS = 500
+
+
+def _category_name(obj):
+    return obj.category.name if obj.category_id else ''
+
+
+def _post_text(post):
+    return post.plain_text or html_to_plain_text(post.content)
+
+
+# kind -> model, เงื่อนไขเผยแพร่, ข้อความเนื้อหา, field ที่ถ้าเปลี่ยนต้อง index ใหม่
+INDEXED_KINDS = {
+    'post': {
+        'model': Post,
+        'published': {'status': 'published'},
+        'body': _post_text,
+        'fields': {'title', 'content', 'status', 'category'},
+    },
+    'video': {
+        'model': Video,
+        'published': {'status': 'published'},
+        'body': lambda v: html_to_plain_text(v.description),
+        'fields': {'title', 'description', 'status', 'category'},
+    },
+    'survey': {
+        'model': Survey,
+        'published': {'is_published': True},
+        'body': lambda s: html_to_plain_text(s.description),
+        'fields': {'title', 'description', 'is_published', 'category'},
+    },
+}
+KIND_BY_MODEL = {spec['model']: kind for kind, spec in INDEXED_KINDS.items()}
+
+
+def is_published(kind, obj):
+    return all(getattr(obj, k) == v for k, v in INDEXED_KINDS[kind]['published'].items())
+
+
+def document_terms(kind, obj):
+    spec = INDEXED_KINDS[kind]
+    terms = tokenize(obj.title) * TITLE_BOOST
+    terms += tokenize(spec['body'](obj))
+    terms += tokenize(_category_name(obj))
+    return terms
+
+
+def remove_object(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def index_object(obj):
+    """(re)index หนึ่งชิ้น — ถ้ายังไม่เผยแพร่จะถูกเอาออกจาก index"""
+    kind = KIND_BY_MODEL[type(obj)]
+    if not is_published(kind, obj):
+        remove_object(kind, obj.pk)
+        return
+    terms = document_terms(kind, obj)
+    with transaction.atomic():
+        doc, created = SearchDocument.objects.update_or_create(
+            kind=kind, object_id=obj.pk, defaults={'length': len(terms)})
+        if not created:
+            doc.postings.all().delete()
+        SearchPosting.objects.bulk_create([
+            SearchPosting(document=doc, kind=kind, term=term, frequency=n)
+            for term, n in Counter(terms).items()
+        ])
+
+
+def rebuild(kinds=None):
+    """สร้าง index ใหม่ทั้งหมด คืน {kind: จำนวนเอกสาร}"""
+    done = {}
+    for kind in kinds or INDEXED_KINDS:
+        spec = INDEXED_KINDS[kind]
+        SearchDocument.objects.filter(kind=kind).delete()
+        qs = spec['model'].objects.filter(**spec['published']).select_related('category')
+        done[kind] = 0
+        for obj in qs.iterator(chunk_size=200):
+            index_object(obj)
+            done[kind] += 1
+    return done
+
+
+def search(query, kind='post', within=None, limit=None):
+    """คืน [(object_id, score), ...] เรียงจากคะแนนสูงไปต่ำ
+
+    within: queryset ของ model ชนิดนั้น — นับเฉพาะเอกสารที่อยู่ในนั้น (กรอง category / tag ก่อนจัดอันดับ)
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+
+    stats = SearchDocument.objects.filter(kind=kind).aggregate(n=Count('id'), avgdl=Avg('length'))
+    total, avgdl = stats['n'], stats['avgdl'] or 1.0
+    if not total:
+        return []
+
+    postings = SearchPosting.objects.filter(kind=kind, term__in=terms)
+    df = dict(postings.values_list('term').annotate(n=Count('id')).order_by())
+    if len(df) < len(terms):
+        return []  # มีคำที่ไม่พบเลย — AND ไม่มีทางตรง
+
+    # AND และ BM25 ทำใน SQL: GROUP BY เอกสาร, HAVING พบครบทุกคำ
+    idf = Case(*[When(term=t, then=Value(math.log(1 + (total - n + 0.5) / (n + 0.5))))
+                 for t, n in df.items()], output_field=FloatField())
+    tf = Cast('frequency', FloatField())
+    norm = Value(K1 * (1 - B)) + Value(K1 * B / avgdl) * Cast('document__length', FloatField())
+    if within is not None:
+        postings = postings.filter(document__object_id__in=within.values('pk'))
+    rows = (postings.values('document__object_id')
+            .annotate(matched=Count('id'), score=Sum(idf * tf * Value(K1 + 1) / (tf + norm)))
+            .filter(matched=len(terms))
+            .order_by('-score', '-document__object_id')
+            .values_list('document__object_id', 'score'))
+    if limit is not None:
+        rows = rows[:limit]
+    return list(rows)
+
+
+def ranked_queryset(queryset, query, limit=MAX_RESULTS):
+    """กรอง queryset ให้เหลือเฉพาะผลค้นหา เรียงตามคะแนน (annotate search_rank)
+
+    ใส่ตัวกรองอื่น (category, tag) ใน queryset ก่อนเรียก — limit ตัดหลังกรองแล้ว
+    """
+    hits = search(query, KIND_BY_MODEL[queryset.model], within=queryset, limit=limit)
+    if not hits:
+        return queryset.none()
+    rank = Case(*[When(pk=pk, then=pos) for pos, (pk, _) in enumerate(hits)],
+                output_field=IntegerField())
+    return queryset.filter(pk__in=[pk for pk, _ in hits]).annotate(search_rank=rank).order_by('search_rank')
@@ -0,0 +1,151 @@
+"""Cache ผลวิเคราะห์ความรู้สึก (ThaiSentimentAnalyzer) ตามเนื้อหาข้อความ
+
+ข้อความเดิมวนกลับมาบ่อยมาก ("สุดยอด 👍", ตอบด้วย emoji อย่างเดียว) ทั้งในโพสต์เดียวกัน
+และข้ามโพสต์ — วิเคราะห์ครั้งเดียวแล้วเก็บไว้
+
+- key: hash ของข้อความที่ normalize แล้ว (ยุบช่องว่าง, ตัวพิมพ์เล็ก) + fingerprint ของพจนานุกรม
+  เพิ่มคำเข้าพจนานุกรมแล้ว key เปลี่ยนเอง ไม่ได้ผลเก่าที่นับคำไม่ครบ
+- ชั้นแรก: LRU ในหน่วยความจำของ process จำกัดจำนวน (SENTIMENT_CACHE_SIZE)
+- ชั้นสอง (ถ้าตั้ง SENTIMENT_CACHE_ALIAS): Django cache เช่น Redis ใช้ร่วมกันทุก worker
+  และอยู่ข้ามการ deploy ได้ เจอในชั้นนี้แล้วดึงขึ้นมาไว้ชั้นแรกด้วย
+
+get_many() / set_many() ใช้กับ batch ใหญ่ — ชั้นสองถาม/เขียนครั้งเดียวทั้งชุด
+แทนการไปกลับ Redis ทีละ key
+
+stats() บอก hit / miss ของแต่ละชั้น
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = 10000
+DEFAULT_TIMEOUT = 60 * 60 * 24
+KEY_PREFIX = 'sentiment:'
+
+
+def cache_key(normalized_text, lexicon_fingerprint):
+    raw = '%s\0%s' % (lexicon_fingerprint, normalized_text)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, maxsize=DEFAULT_SIZE, persistent=None, timeout=DEFAULT_TIMEOUT):
+        """persistent: ชื่อ alias ใน settings.CACHES หรือ cache object — None = หน่วยความจำอย่างเดียว"""
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._persistent = persistent
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.persistent_hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def persistent(self):
+        if isinstance(self._persistent, str):
+            from django.core.cache import caches
+            self._persistent = caches[self._persistent]
+        return self._persistent
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.persistent is not None:
+            value = self.persistent.get(KEY_PREFIX + key)
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.persistent_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_many(self, keys):
+        """{key: value} ของ key ที่เจอ (ไม่มี key ที่ไม่เจอ) — ชั้นสองถามครั้งเดียว"""
+        found, missing = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+                else:
+                    missing.append(key)
+            self.hits += len(found)
+        persistent_found = 0
+        if missing and self.persistent is not None:
+            stored = self.persistent.get_many([KEY_PREFIX + key for key in missing])
+            for key in missing:
+                value = stored.get(KEY_PREFIX + key)
+                if value is not None:
+                    self._remember(key, value)
+                    found[key] = value
+                    persistent_found += 1
+        with self._lock:
+            self.persistent_hits += persistent_found
+            self.misses += len(missing) - persistent_found
+        return found
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.persistent is not None:
+            self.persistent.set(KEY_PREFIX + key, value, self.timeout)
+
+    def set_many(self, mapping):
+        for key, value in mapping.items():
+            self._remember(key, value)
+        if mapping and self.persistent is not None:
+            self.persistent.set_many({KEY_PREFIX + key: value for key, value in mapping.items()},
+                                     self.timeout)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """ล้างเฉพาะชั้นหน่วยความจำและตัวนับ (ชั้นสองหมดอายุเองตาม timeout)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.persistent_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.persistent_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """cache กลางของ process ตั้งค่าจาก settings (SENTIMENT_CACHE_SIZE / _ALIAS / _TIMEOUT)"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            from django.conf import settings
+            # ใช้นอก Django ได้ (สคริปต์) — ไม่มี settings ก็ใช้ค่าเริ่มต้น หน่วยความจำอย่างเดียว
+            conf = settings if settings.configured else object()
+            _default = SentimentCache(
+                maxsize=getattr(conf, 'SENTIMENT_CACHE_SIZE', DEFAULT_SIZE),
+                persistent=getattr(conf, 'SENTIMENT_CACHE_ALIAS', '') or None,
+                timeout=getattr(conf, 'SENTIMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+            )
+        return _default
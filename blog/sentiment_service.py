@@ -3,15 +3,41 @@ Sentiment Analysis Service for Thai Comments
 ระบบวิเคราะห์ความรู้สึกของความคิดเห็นภาษาไทย
 """
 
+import os
 import re
-from textblob import TextBlob
+from concurrent.futures import ProcessPoolExecutor
 from collections import Counter
 import json
 
+import numpy as np
+
+from .lexicon_matcher import LexiconMatcher
+from .sentiment_cache import SentimentCache, cache_key, default_cache
+
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral')
+
+# Batch scoring: below PARALLEL_MIN_COMMENTS the pool startup costs more than it saves
+PARALLEL_MIN_COMMENTS = 2000
+CHUNK_SIZE = 500
+MAX_WORKERS = 8
+
+# Bump when the scoring rules change, so cached results from older code are not reused
+ANALYZER_VERSION = 3
+
+# Script detection: only text whose letters are mostly Latin goes to the English analyzer.
+# Thai, emoji-only and digit-only comments have no English polarity to find
+_LATIN = re.compile(r'[a-z]+')
+_THAI = re.compile(r'[\u0e00-\u0e7f]+')
+
 class ThaiSentimentAnalyzer:
     """Thai Sentiment Analysis Class - Enhanced Version 2.0"""
     
-    def __init__(self):
+    def __init__(self, cache=True):
+        """cache: True = shared process cache (sentiment_cache.default_cache()),
+        a SentimentCache instance, or False/None to always recompute"""
+        if cache is True:
+            cache = default_cache()
+        self.cache = cache if isinstance(cache, SentimentCache) else None
         # Negation words for context analysis
         self.negation_words = {
             'ไม่', 'ไม่ใช่', 'ไม่เคย', 'ไม่มี', 'ไม่ได้', 'ไม่ต้อง', 'ไม่ควร',
@@ -40,6 +66,32 @@ class ThaiSentimentAnalyzer:
             'อย่างไร', 'ทำไม', 'เมื่อไหร่', 'ที่ไหน', 'ใคร', 'อะไร', 'คิดว่า', 'ว่าไง',
             'รู้ไหม', 'เป็นยังไง', 'ช่วยได้ไหม', 'มีใครรู้บ้าง', '🤔', '❓', '❔'
         }
+
+        # Compiled once per lexicon: one pass over the text, leftmost-longest matches
+        # (``ไม่ดี`` counts once as negative, not also ``ไม่`` and ``ดี``)
+        self.matcher = LexiconMatcher({
+            'positive': self.positive_words,
+            'negative': self.negative_words,
+            'neutral': self.neutral_words,
+        })
+
+    def extend_lexicon(self, positive=(), negative=(), neutral=()):
+        """Add words to the lexicon; the matcher is rebuilt once, on the next analysis"""
+        for label, words in zip(SENTIMENT_LABELS, (positive, negative, neutral)):
+            words = set(words)
+            getattr(self, '%s_words' % label).update(words)
+            self.matcher.add(words, label)
+        return self
+
+    @property
+    def lexicon_version(self):
+        return self.matcher.version
+
+    def cache_key(self, clean_text):
+        return cache_key(clean_text, '%d:%s' % (ANALYZER_VERSION, self.matcher.fingerprint))
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
     
     def clean_text(self, text):
         """Clean and normalize text"""
@@ -54,9 +106,26 @@ class ThaiSentimentAnalyzer:
     
     def analyze_sentiment(self, text):
         """
-        Analyze sentiment of Thai text
+        Analyze sentiment of Thai text (cached by normalized text, see sentiment_cache)
         Returns: dict with sentiment score and label
         """
+        if self.cache is None:
+            return self._analyze_uncached(text)
+        # callers add fields to the result (comment_id, ...) - never hand out the cached dict
+        return _copy_result(self._lookup(text))
+
+    def _lookup(self, text):
+        """Result from the cache, or scored and cached (shared dict - do not modify)"""
+        if self.cache is None:
+            return self._analyze_uncached(text)
+        key = self.cache_key(self.clean_text(text))
+        result = self.cache.get(key)
+        if result is None:
+            result = self._analyze_uncached(text)
+            self.cache.set(key, result)
+        return result
+
+    def _analyze_uncached(self, text):
         if not text:
             return {
                 'sentiment': 'neutral',
@@ -65,38 +134,27 @@ class ThaiSentimentAnalyzer:
                 'details': {
                     'positive_count': 0,
                     'negative_count': 0,
-                    'neutral_count': 0
+                    'neutral_count': 0,
+                    'total_words': 0,
+                    'sentiment_words': 0
                 }
             }
         
         clean_text = self.clean_text(text)
         
-        # Count sentiment words with partial matching
-        positive_count = 0
-        negative_count = 0 
-        neutral_count = 0
-        
-        for word in self.positive_words:
-            if word in clean_text:
-                positive_count += clean_text.count(word)
-                
-        for word in self.negative_words:
-            if word in clean_text:
-                negative_count += clean_text.count(word)
-                
-        for word in self.neutral_words:
-            if word in clean_text:
-                neutral_count += clean_text.count(word)
+        # Count sentiment words (substring matches, single pass)
+        counts = self.matcher.counts(clean_text)
+        positive_count = counts['positive']
+        negative_count = counts['negative']
+        neutral_count = counts['neutral']
         
         # Calculate sentiment score
         total_sentiment_words = positive_count + negative_count
         
         if total_sentiment_words == 0:
             # Use TextBlob for English/mixed content
-            try:
-                blob = TextBlob(text)
-                polarity = blob.sentiment.polarity
-                
+            polarity = english_polarity(text) if is_mostly_latin(clean_text) else None
+            if polarity is not None:
                 if polarity > 0.1:
                     sentiment = 'positive'
                     score = polarity
@@ -109,7 +167,7 @@ class ThaiSentimentAnalyzer:
                     
                 confidence = abs(polarity)
                 
-            except:
+            else:
                 sentiment = 'neutral'
                 score = 0.0
                 confidence = 0.0
@@ -138,40 +196,35 @@ class ThaiSentimentAnalyzer:
             }
         }
     
-    def analyze_comments_batch(self, comments):
+    def analyze_comments_batch(self, comments, workers=None, chunk_size=CHUNK_SIZE, compact=False):
         """
         Analyze multiple comments
-        Args: comments (list) - List of comment texts
-        Returns: dict with overall analysis
+        Args:
+            comments (list) - List of comment texts (or dicts with 'id' and 'text')
+            workers (int) - processes to use; default: one per CPU (max MAX_WORKERS).
+                Batches smaller than PARALLEL_MIN_COMMENTS always run in-process,
+                because the process pool startup costs more than it saves there
+            chunk_size (int) - comments sent to a worker per task
+            compact (bool) - return individual_results as SentimentColumns (one array
+                per field, rows built on access) instead of a dict per comment
+        Returns: dict with overall analysis (results keep input order and comment_id)
         """
         if not comments:
             return {
                 'total_comments': 0,
                 'sentiment_distribution': {'positive': 0, 'negative': 0, 'neutral': 0},
                 'average_score': 0.0,
-                'individual_results': []
+                'individual_results': SentimentColumns.from_analyses([], []) if compact else []
             }
         
-        results = []
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-        total_score = 0.0
-        
-        for i, comment in enumerate(comments):
-            if isinstance(comment, dict):
-                text = comment.get('text', '')
-                comment_id = comment.get('id', i)
-            else:
-                text = str(comment)
-                comment_id = i
-            
-            analysis = self.analyze_sentiment(text)
-            analysis['comment_id'] = comment_id
-            analysis['original_text'] = text[:100] + '...' if len(text) > 100 else text
-            
-            results.append(analysis)
-            sentiment_counts[analysis['sentiment']] += 1
-            total_score += analysis['score']
+        items = comment_items(comments)
+        if workers is None:
+            workers = min(os.cpu_count() or 1, MAX_WORKERS)
+        analyses = self._analyze_many(items, workers, chunk_size)
         
+        if compact:
+            return SentimentColumns.from_analyses(items, analyses).summary()
+        results, sentiment_counts, total_score = self._collect(items, map(_copy_result, analyses))
         return {
             'total_comments': len(comments),
             'sentiment_distribution': sentiment_counts,
@@ -184,6 +237,226 @@ class ThaiSentimentAnalyzer:
             'individual_results': results
         }
 
+    def _collect(self, items, analyses):
+        results = []
+        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        total_score = 0.0
+        
+        for (comment_id, text), analysis in zip(items, analyses):
+            analysis['comment_id'] = comment_id
+            analysis['original_text'] = _preview(text)
+            
+            results.append(analysis)
+            sentiment_counts[analysis['sentiment']] += 1
+            total_score += analysis['score']
+        return results, sentiment_counts, total_score
+
+    def _analyze_many(self, items, workers, chunk_size):
+        """Score each distinct text once: cache hits in one get_many, the rest on a
+        process pool when there are enough of them (chunks come back in input order),
+        in-process otherwise. Yields results in input order, shared between repeated
+        texts - copy before changing them"""
+        keys, distinct = [], {}
+        for _, text in items:
+            key = self.cache_key(self.clean_text(text))
+            keys.append(key)
+            distinct.setdefault(key, text)
+        # one round trip to the cache for the whole batch, not one per text
+        scored = self.cache.get_many(distinct) if self.cache is not None else {}
+        todo = {key: text for key, text in distinct.items() if key not in scored}
+        
+        texts = list(todo.values())
+        fresh = None
+        if len(texts) >= PARALLEL_MIN_COMMENTS:
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            fresh = self._map_pool(chunks, min(workers, len(chunks)))
+        if fresh is None:
+            fresh = [self._analyze_uncached(text) for text in texts]
+        fresh = dict(zip(todo, fresh))
+        scored.update(fresh)
+        if self.cache is not None:
+            self.cache.set_many(fresh)
+        
+        return (scored[key] for key in keys)
+
+    def _map_pool(self, chunks, workers):
+        """Results of every chunk in order, or None when a pool is not worth it / not available"""
+        if workers < 2:
+            return None
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(self.positive_words, self.negative_words, self.neutral_words))
+        except (OSError, NotImplementedError):
+            # no multiprocessing here (sandbox, missing /dev/shm) - stay on one core
+            return None
+        with pool:
+            return [result for chunk in pool.map(_analyze_chunk, chunks) for result in chunk]
+
+
+def is_mostly_latin(clean_text):
+    """True if Latin letters outnumber Thai ones (clean_text is already lower-cased)"""
+    latin = sum(map(len, _LATIN.findall(clean_text)))
+    return latin > 0 and latin >= sum(map(len, _THAI.findall(clean_text)))
+
+
+_textblob = None
+
+
+def english_polarity(text):
+    """TextBlob polarity in [-1, 1], or None if TextBlob is not installed / fails.
+    TextBlob is imported on first use: most comments are Thai and never need it"""
+    global _textblob
+    if _textblob is None:
+        try:
+            from textblob import TextBlob
+        except ImportError:
+            TextBlob = False
+        _textblob = TextBlob
+    if not _textblob:
+        return None
+    try:
+        return _textblob(text).sentiment.polarity
+    except Exception:
+        return None
+
+
+def comment_items(comments):
+    """[(comment_id, text), ...] from comment texts or dicts with 'id' / 'text'"""
+    items = []
+    for i, comment in enumerate(comments):
+        if isinstance(comment, dict):
+            items.append((comment.get('id', i), comment.get('text', '') or ''))
+        else:
+            items.append((i, str(comment)))
+    return items
+
+
+# Process pool workers build their analyzer once, with the caller's lexicon
+_worker_analyzer = None
+
+
+def _init_worker(positive_words, negative_words, neutral_words):
+    global _worker_analyzer
+    _worker_analyzer = ThaiSentimentAnalyzer(cache=False).extend_lexicon(
+        positive_words, negative_words, neutral_words)
+
+
+def _analyze_chunk(texts):
+    return [_worker_analyzer._analyze_uncached(text) for text in texts]
+
+
+def _copy_result(result):
+    return dict(result, details=dict(result['details']))
+
+def _preview(text):
+    return text[:100] + '...' if len(text) > 100 else text
+
+
+class SentimentColumns:
+    """Compact batch results: one array per field instead of a dict per comment
+
+    About 30 bytes per comment (label code, float32 score/confidence, word counts,
+    plus references to the caller's ids and texts) against roughly 1 KB for a
+    result dict. Rows are built only when read:
+
+        columns = analyzer.analyze_comments_batch(comments, compact=True)['individual_results']
+        columns.score.mean(), columns.distribution()
+        columns[3]            # same keys as a non-compact result
+    """
+    LABELS = SENTIMENT_LABELS
+    COUNT_FIELDS = ('positive_count', 'negative_count', 'neutral_count')
+
+    def __init__(self, label, score, confidence, counts, total_words, texts, comment_ids=None):
+        self.label = label              # int8 index into LABELS
+        self.score = score              # float32
+        self.confidence = confidence    # float32
+        self.counts = counts            # uint32 (n, 3): positive / negative / neutral words
+        self.total_words = total_words  # uint32
+        self.texts = texts              # the caller's strings, not copies
+        self.comment_ids = comment_ids  # None when ids are just the positions
+
+    @classmethod
+    def from_analyses(cls, items, analyses):
+        n = len(items)
+        label = np.empty(n, dtype=np.int8)
+        score = np.empty(n, dtype=np.float32)
+        confidence = np.empty(n, dtype=np.float32)
+        counts = np.empty((n, 3), dtype=np.uint32)
+        total_words = np.empty(n, dtype=np.uint32)
+        codes = {name: code for code, name in enumerate(cls.LABELS)}
+        for i, analysis in enumerate(analyses):
+            details = analysis['details']
+            label[i] = codes[analysis['sentiment']]
+            score[i] = analysis['score']
+            confidence[i] = analysis['confidence']
+            counts[i] = [details[field] for field in cls.COUNT_FIELDS]
+            total_words[i] = details.get('total_words', 0)
+        ids = [comment_id for comment_id, _ in items]
+        positional = all(comment_id == i for i, comment_id in enumerate(ids))
+        return cls(label, score, confidence, counts, total_words,
+                   [text for _, text in items], None if positional else ids)
+
+    def __len__(self):
+        return len(self.label)
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        counts = [int(c) for c in self.counts[i]]
+        return {
+            'sentiment': self.LABELS[self.label[i]],
+            'score': round(float(self.score[i]), 3),
+            'confidence': round(float(self.confidence[i]), 3),
+            'details': dict(zip(self.COUNT_FIELDS, counts),
+                            total_words=int(self.total_words[i]),
+                            sentiment_words=counts[0] + counts[1]),
+            'comment_id': i if self.comment_ids is None else self.comment_ids[i],
+            'original_text': _preview(self.texts[i]),
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    # ---- aggregates (vectorized) ----
+
+    def distribution(self):
+        totals = np.bincount(self.label, minlength=len(self.LABELS))
+        return {name: int(totals[code]) for code, name in enumerate(self.LABELS)}
+
+    def percentages(self):
+        n = len(self) or 1
+        return {name: round(count / n * 100, 1) for name, count in self.distribution().items()}
+
+    def average_score(self):
+        return round(float(self.score.sum(dtype=np.float64)) / len(self), 3) if len(self) else 0.0
+
+    def summary(self):
+        """Same shape as analyze_comments_batch(), with this object as individual_results"""
+        return {
+            'total_comments': len(self),
+            'sentiment_distribution': self.distribution(),
+            'sentiment_percentages': self.percentages(),
+            'average_score': self.average_score(),
+            'individual_results': self,
+        }
+
+    def to_dict(self):
+        """Plain lists per column, for JSON - every field of a row, details flattened"""
+        return {
+            'comment_id': list(range(len(self))) if self.comment_ids is None else list(self.comment_ids),
+            'sentiment': [self.LABELS[code] for code in self.label],
+            'score': np.round(self.score.astype(np.float64), 3).tolist(),
+            'confidence': np.round(self.confidence.astype(np.float64), 3).tolist(),
+            'positive_count': self.counts[:, 0].tolist(),
+            'negative_count': self.counts[:, 1].tolist(),
+            'neutral_count': self.counts[:, 2].tolist(),
+            'total_words': self.total_words.tolist(),
+            'sentiment_words': (self.counts[:, 0] + self.counts[:, 1]).tolist(),
+            'original_text': [_preview(text) for text in self.texts],
+        }
+
 
 class FacebookPostAnalyzer:
     """Analyze Facebook Post Comments with Sentiment"""
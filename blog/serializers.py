@@ -1,9 +1,74 @@
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
+from .fieldsets import SparseFieldsetMixin
 from .models import Post, Category, PostType, Video, Survey
 from taggit.models import Tag
 
+# บวกหนึ่งทุกครั้งที่รูปแบบ JSON ของ API เปลี่ยน — เป็นส่วนหนึ่งของ ETag (blog/conditional.py)
+API_SERIALIZER_VERSION = 1
 
-class CategorySerializer(serializers.ModelSerializer):
+
+def _published_count(model, published):
+    """Correlated COUNT of published rows per category, for use in annotate()"""
+    rows = (model.objects.filter(category=OuterRef('pk'), **published)
+            .order_by().values('category').annotate(n=Count('pk')).values('n'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class ContentCounts:
+    """Published content counts per category and post type.
+
+    Loaded lazily with one grouped query per table and kept in the serializer
+    context, so a list response costs at most two count queries no matter how
+    many rows embed a category or post type.
+    """
+
+    def __init__(self):
+        self._categories = None
+        self._post_types = None
+
+    def category(self, category_id):
+        if self._categories is None:
+            rows = Category.objects.order_by().annotate(
+                post_count=_published_count(Post, {'status': 'published'}),
+                video_count=_published_count(Video, {'status': 'published'}),
+                survey_count=_published_count(Survey, {'is_published': True}),
+            ).values_list('id', 'post_count', 'video_count', 'survey_count')
+            self._categories = {pk: counts for pk, *counts in rows}
+        return self._categories.get(category_id, (0, 0, 0))
+
+    def post_type(self, post_type_id):
+        if self._post_types is None:
+            self._post_types = dict(PostType.objects.order_by().values('id').annotate(
+                n=Count('posts', filter=Q(posts__status='published'))
+            ).values_list('id', 'n'))
+        return self._post_types.get(post_type_id, 0)
+
+    @classmethod
+    def for_context(cls, context):
+        counts = context.get('content_counts')
+        if counts is None:
+            counts = context['content_counts'] = cls()
+        return counts
+
+
+class SharedRepresentationMixin:
+    """Serialize each related object once per response.
+
+    Many rows point at the same handful of categories / post types; the
+    nested representation is built once and the same dict is reused.
+    """
+
+    def to_representation(self, instance):
+        memo = self.context.setdefault('shared_representations', {})
+        key = (self.__class__, instance.pk)
+        if key not in memo:
+            memo[key] = super().to_representation(instance)
+        return memo[key]
+
+
+class CategorySerializer(SharedRepresentationMixin, serializers.ModelSerializer):
     """Serializer for Category model"""
     post_count = serializers.SerializerMethodField()
     video_count = serializers.SerializerMethodField()
@@ -14,28 +79,27 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'post_count', 'video_count', 'survey_count', 'total_count']
 
+    def _counts(self, obj):
+        return ContentCounts.for_context(self.context).category(obj.pk)
+
     def get_post_count(self, obj):
         """Get published post count for this category"""
-        return obj.posts.filter(status='published').count()
+        return self._counts(obj)[0]
 
     def get_video_count(self, obj):
         """Get published video count for this category"""
-        return obj.videos.filter(status='published').count()
+        return self._counts(obj)[1]
 
     def get_survey_count(self, obj):
         """Get published survey count for this category"""
-        return obj.surveys.filter(is_published=True).count()
+        return self._counts(obj)[2]
 
     def get_total_count(self, obj):
         """Get total content count (posts + videos + surveys)"""
-        return (
-            obj.posts.filter(status='published').count() +
-            obj.videos.filter(status='published').count() +
-            obj.surveys.filter(is_published=True).count()
-        )
+        return sum(self._counts(obj))
 
 
-class PostTypeSerializer(serializers.ModelSerializer):
+class PostTypeSerializer(SharedRepresentationMixin, serializers.ModelSerializer):
     """Serializer for PostType model"""
     post_count = serializers.SerializerMethodField()
     
@@ -45,7 +109,7 @@ class PostTypeSerializer(serializers.ModelSerializer):
     
     def get_post_count(self, obj):
         """Get published post count for this post type"""
-        return obj.posts.filter(status='published').count()
+        return ContentCounts.for_context(self.context).post_type(obj.pk)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -56,7 +120,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Post list view (lighter data)"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
@@ -67,6 +131,11 @@ class PostListSerializer(serializers.ModelSerializer):
     reading_time = serializers.SerializerMethodField()
     featured_image_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'featured_image_url': ('featured_image',),
+    }
+
     class Meta:
         model = Post
         fields = [
@@ -94,7 +163,7 @@ class PostListSerializer(serializers.ModelSerializer):
         return None
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
+class PostDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Post detail view (full data)"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
@@ -104,6 +173,11 @@ class PostDetailSerializer(serializers.ModelSerializer):
     reading_time = serializers.SerializerMethodField()
     featured_image_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'featured_image_url': ('featured_image',),
+    }
+
     class Meta:
         model = Post
         fields = [
@@ -127,7 +201,7 @@ class PostDetailSerializer(serializers.ModelSerializer):
             return obj.featured_image.url
         return None
 
-class VideoListSerializer(serializers.ModelSerializer):
+class VideoListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Video list view (lighter data)"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
@@ -135,6 +209,11 @@ class VideoListSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     thumbnail_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'thumbnail_url': ('thumbnail',),
+    }
+
     class Meta:
         model = Video
         fields = [
@@ -155,7 +234,7 @@ class VideoListSerializer(serializers.ModelSerializer):
         return None
 
 
-class VideoDetailSerializer(serializers.ModelSerializer):
+class VideoDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Video detail view (full data)"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
@@ -163,6 +242,11 @@ class VideoDetailSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     thumbnail_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'thumbnail_url': ('thumbnail',),
+    }
+
     class Meta:
         model = Video
         fields = [
@@ -183,13 +267,18 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         return None
 
 
-class SurveyListSerializer(serializers.ModelSerializer):
+class SurveyListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Survey list view"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
     category = CategorySerializer(read_only=True)
     survey_file_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'survey_file_url': ('survey_file',),
+    }
+
     class Meta:
         model = Survey
         fields = [
@@ -210,13 +299,18 @@ class SurveyListSerializer(serializers.ModelSerializer):
         return None
 
 
-class SurveyDetailSerializer(serializers.ModelSerializer):
+class SurveyDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Survey detail view"""
     author = serializers.StringRelatedField()
     author_username = serializers.CharField(source='author.username', read_only=True)
     category = CategorySerializer(read_only=True)
     survey_file_url = serializers.SerializerMethodField()
 
+    field_sources = {
+        'author_username': ('author',),
+        'survey_file_url': ('survey_file',),
+    }
+
     class Meta:
         model = Survey
         fields = [
@@ -0,0 +1,122 @@
+"""Signal handlers ของแอป blog — ต่อเข้าระบบใน BlogConfig.ready()"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from taggit.models import Tag, TaggedItem
+
+from . import media_store, search
+from .api_cache import bump_generation
+from .models import Category, Post, PostType, Survey, Video
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=Survey)
+def update_search_index(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    fields = search.INDEXED_KINDS[search.KIND_BY_MODEL[sender]]['fields']
+    # save(update_fields=['view_count']) ไม่ต้องแตะ index
+    if update_fields is not None and not fields & set(update_fields):
+        return
+    # snapshot ของ FieldTrackerMixin ยังเป็นค่าก่อนบันทึกตอนที่ signal นี้ทำงาน
+    if not created and not fields & instance.changed_fields():
+        return
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Video)
+@receiver(post_delete, sender=Survey)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_object(search.KIND_BY_MODEL[sender], instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_contents(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # ชื่อ category อยู่ใน index ด้วย — เปลี่ยนชื่อแล้วต้อง index เนื้อหาในหมวดใหม่
+    # แก้ field อื่น (slug, คำอธิบาย) ไม่ต้องไล่ index ทั้งหมวด
+    if raw or created:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    if not instance.field_changed('name'):
+        return
+    for kind, spec in search.INDEXED_KINDS.items():
+        for obj in spec['model'].objects.filter(category=instance, **spec['published']):
+            search.index_object(obj)
+
+
+# ---- cache ของ API (blog/api_cache.py) ----
+
+def _publicly_visible(instance):
+    """True ถ้าการบันทึกครั้งนี้มีผลกับสิ่งที่หน้าเว็บเห็น"""
+    kind = search.KIND_BY_MODEL[type(instance)]
+    status_field = next(iter(search.INDEXED_KINDS[kind]['published']))
+    # ร่างที่ยังไม่เคยเผยแพร่ ไม่ต้องล้าง cache
+    return search.is_published(kind, instance) or instance.field_changed(status_field)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=Survey)
+def invalidate_api_cache_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # ยอดเข้าชมไม่ทำให้ cache หมดอายุ (ดู API_CACHE_TIMEOUT)
+    if update_fields is not None and set(update_fields) <= {'view_count'}:
+        return
+    if _publicly_visible(instance):
+        bump_generation()
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Video)
+@receiver(post_delete, sender=Survey)
+def invalidate_api_cache_on_delete(sender, instance, **kwargs):
+    if search.is_published(search.KIND_BY_MODEL[sender], instance):
+        bump_generation()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=PostType)
+@receiver(post_delete, sender=PostType)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_api_cache(sender, raw=False, **kwargs):
+    if not raw:
+        bump_generation()
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_api_cache_on_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation()
+
+
+# ---- การอ้างอิงรูปใน media_store ----
+
+IMAGE_FIELDS = {Post: 'featured_image', Video: 'thumbnail'}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Video)
+def count_image_references(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    field = IMAGE_FIELDS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    if not instance.field_changed(field):
+        return
+    # snapshot ยังเป็นชื่อไฟล์ก่อนบันทึก (ดู update_search_index)
+    old = '' if created else (getattr(instance, '_loaded_values', None) or {}).get(field)
+    media_store.retain(instance._tracked_value(field))
+    media_store.release(old)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Video)
+def release_image_reference(sender, instance, **kwargs):
+    media_store.release(instance._tracked_value(IMAGE_FIELDS[sender]))
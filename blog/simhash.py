@@ -0,0 +1,141 @@
+"""SimHash 64 บิตสำหรับหาโพสต์ที่ข้อความเกือบเหมือนกัน
+
+เพจ Facebook มักโพสต์ข้อความเดิมซ้ำโดยแก้นิดหน่อย (เติมวันที่, แก้คำผิด, เพิ่ม hashtag)
+source_id กันได้แค่โพสต์เดียวกัน — ที่นี่เทียบเนื้อหาแทน
+
+- feature: shingle 3 ตัวอักษรของข้อความที่ยุบช่องว่างแล้ว (ภาษาไทยไม่เว้นวรรคระหว่างคำ)
+- ข้อความใกล้กัน = ค่า hash ต่างกันไม่กี่บิต (Hamming distance)
+- SimHashIndex แบ่ง 64 บิตเป็น k+1 ช่วง (band) ถ้าต่างกันไม่เกิน k บิต
+  จะต้องมีอย่างน้อยหนึ่ง band ที่ตรงกันทุกบิต (pigeonhole) หาได้ด้วย dict lookup
+  ไม่ต้องเทียบกับทุกโพสต์
+
+ค่าที่เก็บใน Post.simhash / Video.simhash เป็น signed 64 บิต (BigIntegerField)
+ใช้ to_signed() / to_unsigned() แปลง
+"""
+
+import hashlib
+import re
+from collections import Counter, defaultdict
+
+BITS = 64
+MASK = (1 << BITS) - 1
+SHINGLE = 3
+MAX_DISTANCE = 6
+
+_WS = re.compile(r"\s+")
+
+
+def _feature_hash(gram):
+    return int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(text):
+    """SimHash ของข้อความล้วน (ไม่มี HTML) — ข้อความว่างได้ None"""
+    text = _WS.sub(" ", (text or "").lower()).strip()
+    if not text:
+        return None
+    if len(text) <= SHINGLE:
+        grams = Counter([text])
+    else:
+        grams = Counter(text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1))
+    weights = [0] * BITS
+    for gram, count in grams.items():
+        h = _feature_hash(gram)
+        for bit in range(BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def distance(a, b):
+    return ((a ^ b) & MASK).bit_count()
+
+
+def to_signed(value):
+    if value is None:
+        return None
+    return value - (1 << BITS) if value >> (BITS - 1) else value
+
+
+def to_unsigned(value):
+    return None if value is None else value & MASK
+
+
+class SimHashIndex:
+    """index ในหน่วยความจำ หาค่าที่ห่างไม่เกิน max_distance บิต
+
+        index = SimHashIndex.from_db()
+        index.nearest(h)          # -> (key, distance) หรือ None
+        index.add(("post", 12), h)
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        n = max_distance + 1
+        size, extra = divmod(BITS, n)
+        self.bands, start = [], 0
+        for i in range(n):
+            width = size + (1 if i < extra else 0)
+            self.bands.append((start, (1 << width) - 1))
+            start += width
+        self.tables = [defaultdict(list) for _ in self.bands]
+        self.size = 0
+        self.loaded_upto = {}  # kind -> id ล่าสุดที่โหลดจากฐานข้อมูล
+
+    def __len__(self):
+        return self.size
+
+    def _keys(self, value):
+        return [(value >> shift) & mask for shift, mask in self.bands]
+
+    def add(self, key, value):
+        if value is None:
+            return
+        value = to_unsigned(value)
+        for table, band in zip(self.tables, self._keys(value)):
+            table[band].append((key, value))
+        self.size += 1
+
+    def matches(self, value):
+        """[(key, distance), ...] เรียงจากใกล้ไปไกล"""
+        if value is None:
+            return []
+        value = to_unsigned(value)
+        limit = self.max_distance
+        found = {}
+        for table, band in zip(self.tables, self._keys(value)):
+            for key, other in table.get(band, ()):
+                # ค่าที่เก็บเป็น unsigned แล้ว ไม่ต้อง mask — loop นี้คือจุดที่ร้อนที่สุด
+                d = (value ^ other).bit_count()
+                if d <= limit:
+                    found[key] = d
+        return sorted(found.items(), key=lambda item: item[1])
+
+    def nearest(self, value):
+        found = self.matches(value)
+        return found[0] if found else None
+
+    @classmethod
+    def from_db(cls, max_distance=MAX_DISTANCE):
+        """index ของ Post และ Video ทุกแถวที่คำนวณ simhash แล้ว — key คือ ("post", id) / ("video", id)"""
+        index = cls(max_distance)
+        index.update_from_db()
+        return index
+
+    def update_from_db(self):
+        """เพิ่มเฉพาะแถวที่ id ใหม่กว่าที่โหลดไว้ (ใช้กับ process ที่ถือ index ไว้นาน ๆ)
+
+        แถวเดิมที่แก้เนื้อหาทีหลังจะยังเป็นค่าเก่าจนกว่าจะสร้าง index ใหม่
+        """
+        from .models import Post, Video
+
+        loaded = self.loaded_upto
+        for kind, model in (("post", Post), ("video", Video)):
+            rows = (model.objects.filter(simhash__isnull=False, id__gt=loaded.get(kind, 0))
+                    .order_by("id").values_list("id", "simhash"))
+            for pk, value in rows.iterator(chunk_size=5000):
+                self.add((kind, pk), value)
+                loaded[kind] = pk
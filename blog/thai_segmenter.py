@@ -0,0 +1,95 @@
+"""ตัดคำภาษาไทยด้วยพจนานุกรม (longest matching)
+
+ภาษาไทยไม่เว้นวรรคระหว่างคำ ``icontains`` จึงเป็นทางเดียวที่เคยใช้ค้นหาได้
+โมดูลนี้แยกข้อความเป็น token สำหรับ inverted index (blog/search.py)
+
+- ช่วงที่เป็นอักษรไทย: เลือกคำที่ยาวที่สุดในพจนานุกรมที่ขึ้นต้นตรงตำแหน่งนั้น
+  ตัวอักษรที่ไม่เข้าคำไหนจะรวมเป็นก้อน "คำที่ไม่รู้จัก" แล้วแตกเป็นคู่ตัวอักษร (bigram)
+  ทำให้ยังค้นเจอคำที่ไม่มีในพจนานุกรม ตราบใดที่ตัดคำค้นด้วยวิธีเดียวกัน
+- ส่วนอื่น (อังกฤษ ตัวเลข): แยกตาม \\w+ แล้วแปลงเป็นตัวพิมพ์เล็ก
+
+พจนานุกรมอยู่ที่ blog/data/thai_words.txt — แก้แล้วต้องสร้าง index ใหม่
+"""
+
+import os
+import re
+from functools import lru_cache
+
+WORDS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'thai_words.txt')
+
+# ช่วงอักษรไทยทั้งหมด รวมสระและวรรณยุกต์
+THAI_RUN = re.compile(r'[฀-๿]+')
+OTHER_WORD = re.compile(r'[^\W฀-๿]+')
+# สระ/วรรณยุกต์ที่ขึ้นต้นพยางค์ไม่ได้ — ไม่ให้ bigram ขึ้นต้นด้วยตัวเหล่านี้
+THAI_COMBINING = set('ัิีึืฺุู็่้๊๋์ํ๎')
+
+MAX_TOKEN_LENGTH = 64
+
+
+class ThaiSegmenter:
+    def __init__(self, words=()):
+        self.words = {w for w in words if w}
+        self.max_len = max((len(w) for w in self.words), default=0)
+
+    @classmethod
+    def from_file(cls, path=WORDS_PATH):
+        with open(path, encoding='utf-8') as f:
+            words = [ln.strip() for ln in f if ln.strip() and not ln.startswith('#')]
+        return cls(words)
+
+    def _longest_word(self, text, start):
+        for end in range(min(len(text), start + self.max_len), start, -1):
+            if text[start:end] in self.words:
+                return end
+        return None
+
+    def _unknown(self, chunk):
+        """แตกช่วงที่ไม่รู้จักเป็น bigram ของ "ตัวอักษร" (รวมสระ/วรรณยุกต์ที่ตามมา)"""
+        clusters = []
+        for ch in chunk:
+            if clusters and ch in THAI_COMBINING:
+                clusters[-1] += ch
+            else:
+                clusters.append(ch)
+        if len(clusters) <= 2:
+            return [''.join(clusters)]
+        return [clusters[i] + clusters[i + 1] for i in range(len(clusters) - 1)]
+
+    def segment_thai(self, run):
+        tokens, unknown_start, i = [], None, 0
+        while i < len(run):
+            end = self._longest_word(run, i)
+            if end is None:
+                if unknown_start is None:
+                    unknown_start = i
+                i += 1
+                continue
+            if unknown_start is not None:
+                tokens.extend(self._unknown(run[unknown_start:i]))
+                unknown_start = None
+            tokens.append(run[i:end])
+            i = end
+        if unknown_start is not None:
+            tokens.extend(self._unknown(run[unknown_start:]))
+        return tokens
+
+    def tokenize(self, text):
+        """ข้อความ -> list ของ token ตามลำดับที่ปรากฏ"""
+        text = (text or '').lower()
+        tokens = []
+        pos = 0
+        for m in THAI_RUN.finditer(text):
+            tokens.extend(OTHER_WORD.findall(text[pos:m.start()]))
+            tokens.extend(self.segment_thai(m.group()))
+            pos = m.end()
+        tokens.extend(OTHER_WORD.findall(text[pos:]))
+        return [t[:MAX_TOKEN_LENGTH] for t in tokens]
+
+
+@lru_cache(maxsize=1)
+def default_segmenter():
+    return ThaiSegmenter.from_file()
+
+
+def tokenize(text):
+    return default_segmenter().tokenize(text)
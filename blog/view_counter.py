@@ -0,0 +1,202 @@
+"""นับยอดเข้าชมแบบ write-behind
+
+หน้า detail ทุกหน้าเคยทำ ``obj.view_count += 1; obj.save(update_fields=['view_count'])``
+คือเขียนฐานข้อมูลหนึ่งครั้งต่อการเปิดอ่านหนึ่งครั้ง แถมถ้ามีคนเปิดพร้อมกันยอดจะหาย
+(ต่างคนต่างอ่านค่าเดิมแล้วเขียนทับ)
+
+โมดูลนี้เก็บยอดไว้ในหน่วยความจำของแต่ละ worker แล้วค่อยเขียนรวดเดียวเป็น
+``UPDATE ... SET view_count = view_count + n`` ภายใน VIEW_COUNT_FLUSH_INTERVAL วินาที
+หลังการเข้าชมแรกที่ค้าง (timer ของ worker — worker ที่เงียบไปก็ยังเขียน)
+หรือทันทีเมื่อค้างเกิน VIEW_COUNT_FLUSH_THRESHOLD ครั้ง
+ตอน worker ปิดตัว gunicorn เรียก flush_view_counts() จาก hook worker_exit
+
+ไม่ใช้ atexit: ตอน interpreter จบ connection อาจชี้ไปฐานข้อมูลอื่นแล้ว
+(เช่นหลัง test runner ลบฐานข้อมูลทดสอบ ยอดจะไปลงฐานข้อมูลจริง)
+
+ถ้าเขียนฐานข้อมูลไม่สำเร็จ ยอดจะถูกพักลงไฟล์ใน VIEW_COUNT_SPOOL_DIR
+แล้วให้ ``python manage.py flush_view_counts`` มาเก็บกวาดทีหลัง ยอดจึงไม่หาย
+
+ตั้ง VIEW_COUNT_FLUSH_INTERVAL = 0 เพื่อเขียนทันทีทุกครั้ง
+เทสต์ที่ใช้ buffer กลาง (view_counts) ต้องล้างด้วย view_counts.clear() ทุกเทสต์
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def spool_dir():
+    return _setting('VIEW_COUNT_SPOOL_DIR',
+                    os.path.join(tempfile.gettempdir(), 'civicblogs_view_counts'))
+
+
+def apply_counts(counts):
+    """เขียนยอดที่สะสมไว้ลงฐานข้อมูล
+
+    counts คือ {(app_label.model, pk): n}
+    รวม pk ที่เพิ่มเท่ากันไว้ใน UPDATE เดียว — ส่วนใหญ่ n มีไม่กี่ค่า
+    จึงใช้ไม่กี่ query ต่อรอบ ไม่ว่าจะมีกี่โพสต์
+    """
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (label, pk), n in counts.items():
+        if n:
+            grouped[label][n].append(pk)
+
+    with transaction.atomic():
+        for label, by_increment in grouped.items():
+            model = apps.get_model(label)
+            for n, pks in by_increment.items():
+                model.objects.filter(pk__in=pks).update(view_count=F('view_count') + n)
+
+
+class ViewCountBuffer:
+    """บัฟเฟอร์ยอดเข้าชมของ worker หนึ่งตัว (thread-safe)"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def record(self, instance):
+        """นับการเข้าชมหนึ่งครั้ง และบวกค่าใน instance ให้หน้าเว็บแสดงยอดล่าสุด"""
+        instance.view_count += 1
+        key = (instance._meta.label_lower, instance.pk)
+        with self._lock:
+            self._counts[key] += 1
+            pending = sum(self._counts.values())
+        if self._flush_due(pending):
+            self.flush()
+        else:
+            self._schedule()
+
+    def pending(self, instance=None):
+        with self._lock:
+            if instance is None:
+                return sum(self._counts.values())
+            return self._counts.get((instance._meta.label_lower, instance.pk), 0)
+
+    def _flush_due(self, pending):
+        interval = _setting('VIEW_COUNT_FLUSH_INTERVAL', 30)
+        if interval <= 0:
+            return True
+        if pending >= _setting('VIEW_COUNT_FLUSH_THRESHOLD', 500):
+            return True
+        return time.monotonic() - self._last_flush >= interval
+
+    def _schedule(self):
+        """ตั้ง timer ให้เขียนภายใน interval แม้จะไม่มีการเข้าชมครั้งถัดไป"""
+        with self._lock:
+            if self._timer is not None or not self._counts:
+                return
+            self._timer = threading.Timer(_setting('VIEW_COUNT_FLUSH_INTERVAL', 30), self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # connection ของ thread timer เอง — ไม่ปล่อยค้าง
+            connections.close_all()
+
+    def clear(self):
+        """ทิ้งยอดที่ค้างโดยไม่เขียน (เทสต์)"""
+        with self._lock:
+            self._counts = Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def flush(self):
+        """เขียนยอดที่ค้างลงฐานข้อมูล คืนจำนวนครั้งที่เขียนได้"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return 0
+        try:
+            apply_counts(counts)
+        except Exception as e:
+            logger.warning('view count flush failed, spooling %d views: %s',
+                           sum(counts.values()), e)
+            spool(counts)
+            return 0
+        return sum(counts.values())
+
+
+def spool(counts):
+    """พักยอดลงไฟล์ — ใช้เมื่อเขียนฐานข้อมูลไม่ได้ เช่นตอน DB ล่มหรือ worker ถูกปิด"""
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '%d-%s.json' % (os.getpid(), uuid.uuid4().hex))
+    rows = [[label, pk, n] for (label, pk), n in counts.items()]
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(rows, f)
+    os.replace(tmp, path)
+    return path
+
+
+def drain_spool():
+    """เก็บกวาดยอดที่พักไว้ในไฟล์ คืน (จำนวนไฟล์, จำนวนครั้ง)"""
+    directory = spool_dir()
+    if not os.path.isdir(directory):
+        return 0, 0
+
+    counts, claimed = Counter(), []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        # rename ก่อนอ่าน กันสองโปรเซสเก็บไฟล์เดียวกันซ้ำ
+        mine = path + '.draining'
+        try:
+            os.rename(path, mine)
+        except OSError:
+            continue
+        with open(mine) as f:
+            for label, pk, n in json.load(f):
+                counts[(label, pk)] += n
+        claimed.append(mine)
+
+    if counts:
+        try:
+            apply_counts(counts)
+        except Exception:
+            for path in claimed:
+                os.rename(path, path[:-len('.draining')])
+            raise
+    for path in claimed:
+        os.remove(path)
+    return len(claimed), sum(counts.values())
+
+
+view_counts = ViewCountBuffer()
+
+
+def record_view(instance):
+    view_counts.record(instance)
+
+
+def flush_view_counts():
+    return view_counts.flush()
+
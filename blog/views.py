@@ -1,17 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, TemplateView, FormView
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from taggit.models import Tag
-from .models import Post, Category, Newsletter, ContactMessage, PostType
+from .models import LIST_DEFERRED_FIELDS, Post, Category, Newsletter, ContactMessage, PostType
 try:
     from .models import Video
 except ImportError:
     Video = None
 from .forms import ContactForm, NewsletterForm
+from .search import ranked_queryset
+from .view_counter import record_view
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 
@@ -24,7 +26,7 @@ class PostListView(ListView):
     
     def get_queryset(self):
         try:
-            return Post.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags')
+            return Post.objects.filter(status='published').select_related('author', 'category').prefetch_related('tags').defer(*LIST_DEFERRED_FIELDS)
         except Exception:
             return Post.objects.none()
     
@@ -66,8 +68,7 @@ class PostDetailView(DetailView):
     
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        obj.view_count += 1
-        obj.save(update_fields=['view_count'])
+        record_view(obj)
         return obj
     
     def get_context_data(self, **kwargs):
@@ -75,7 +76,7 @@ class PostDetailView(DetailView):
         context['related_posts'] = Post.objects.filter(
             category=self.object.category,
             status='published'
-        ).exclude(id=self.object.id)[:3]
+        ).defer(*LIST_DEFERRED_FIELDS).exclude(id=self.object.id)[:3]
         return context
 
 
@@ -90,8 +91,7 @@ if Video is not None:
         
         def get_object(self, queryset=None):
             obj = super().get_object(queryset)
-            obj.view_count += 1
-            obj.save(update_fields=['view_count'])
+            record_view(obj)
             return obj
         
         def get_context_data(self, **kwargs):
@@ -115,7 +115,7 @@ class CategoryDetailView(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['posts'] = self.object.posts.filter(status='published').select_related('author')
+        context['posts'] = self.object.posts.filter(status='published').select_related('author').defer(*LIST_DEFERRED_FIELDS)
         return context
 
 
@@ -127,7 +127,7 @@ class TaggedPostsView(ListView):
     
     def get_queryset(self):
         tag_slug = self.kwargs['slug']
-        return Post.objects.filter(tags__slug=tag_slug, status='published').select_related('author', 'category')
+        return Post.objects.filter(tags__slug=tag_slug, status='published').select_related('author', 'category').defer(*LIST_DEFERRED_FIELDS)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -144,12 +144,10 @@ class SearchView(ListView):
     def get_queryset(self):
         query = self.request.GET.get('q')
         if query:
-            return Post.objects.filter(
-                Q(title__icontains=query) | 
-                Q(content__icontains=query) | 
-                Q(excerpt__icontains=query),
-                status='published'
-            ).select_related('author', 'category').distinct()
+            return ranked_queryset(
+                Post.objects.filter(status='published').select_related('author', 'category').defer(*LIST_DEFERRED_FIELDS),
+                query
+            )
         return Post.objects.none()
     
     def get_context_data(self, **kwargs):
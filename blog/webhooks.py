@@ -0,0 +1,110 @@
+"""รับ webhook ของเพจ Facebook (field "feed") แล้วต่อคิวโพสต์ที่เปลี่ยน
+
+แทนการไล่หน้าเพจทุกรอบของ cron: Facebook ส่งมาเองเมื่อมีโพสต์ใหม่หรือแก้ไข
+view นี้ทำแค่ตรวจลายเซ็นแล้วเก็บ id ลง PendingImport ตอบกลับทันที
+(Facebook ถือว่าล้มเหลวถ้าตอบช้า) การดึงเนื้อหาและนำเข้าอยู่ใน
+
+    python manage.py process_facebook_webhooks --daemon
+
+  GET  : ยืนยัน subscription (hub.mode=subscribe, hub.verify_token, hub.challenge)
+  POST : X-Hub-Signature-256 = "sha256=" + HMAC-SHA256(FACEBOOK_APP_SECRET, body)
+         ไม่ได้ตั้ง secret หรือลายเซ็นไม่ตรง -> 403
+
+การแจ้งเรื่อง comment / reaction มาใน field "feed" เหมือนกัน จึงรับเฉพาะ item ที่เป็นโพสต์
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .models import PendingImport
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+POST_ITEMS = {"status", "post", "photo", "video", "share", "link"}
+POST_VERBS = {"add", "edited"}
+
+
+def sign(body, secret=None):
+    """ค่า X-Hub-Signature-256 ของ body (bytes)"""
+    secret = settings.FACEBOOK_APP_SECRET if secret is None else secret
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def valid_signature(body, header):
+    secret = settings.FACEBOOK_APP_SECRET
+    if not secret or not header:
+        return False
+    return hmac.compare_digest(sign(body, secret), header)
+
+
+def changed_posts(payload):
+    """[(page_id, post_id, verb), ...] จาก payload ของ webhook — ข้ามทุกอย่างที่ไม่ใช่โพสต์ของเพจ"""
+    if not isinstance(payload, dict) or payload.get("object") != "page":
+        return []
+    found = []
+    for entry in payload.get("entry") or []:
+        page_id = str(entry.get("id") or "")
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            if change.get("field") != "feed" or not isinstance(value, dict):
+                continue
+            if value.get("item") not in POST_ITEMS or value.get("verb") not in POST_VERBS:
+                continue
+            post_id = value.get("post_id")
+            if post_id:
+                found.append((page_id or str(post_id).split("_")[0], str(post_id), value["verb"]))
+    return found
+
+
+def enqueue(changes):
+    """เพิ่มลงคิว โพสต์ที่รออยู่แล้วไม่เพิ่มซ้ำ — คืนจำนวนที่ส่งเข้าไป"""
+    rows = {post_id: PendingImport(source_id=post_id, page_id=page_id, verb=verb)
+            for page_id, post_id, verb in changes}
+    PendingImport.objects.bulk_create(rows.values(), ignore_conflicts=True)
+    return len(rows)
+
+
+def record(body):
+    directory = settings.FACEBOOK_WEBHOOK_RECORD_DIR
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        name = "%s-%s.json" % (timezone.now().strftime("%Y%m%dT%H%M%S%f"), uuid.uuid4().hex[:6])
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(body)
+    except OSError:
+        logger.exception("บันทึก webhook ไม่สำเร็จ")
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def facebook(request):
+    if request.method == "GET":
+        token = settings.FACEBOOK_WEBHOOK_VERIFY_TOKEN
+        if (request.GET.get("hub.mode") == "subscribe" and token
+                and hmac.compare_digest(request.GET.get("hub.verify_token", ""), token)):
+            return HttpResponse(request.GET.get("hub.challenge", ""), content_type="text/plain")
+        return HttpResponseForbidden("verify token ไม่ถูกต้อง")
+
+    body = request.body
+    if not valid_signature(body, request.headers.get(SIGNATURE_HEADER)):
+        return HttpResponseForbidden("ลายเซ็นไม่ถูกต้อง")
+    record(body)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return HttpResponseBadRequest("JSON ไม่ถูกต้อง")
+    queued = enqueue(changed_posts(payload))
+    return HttpResponse("queued %d" % queued, content_type="text/plain")
@@ -362,6 +362,54 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Keyset pagination (blog/pagination.py)
+# ตอนนี้ได้ผลแบบ cursor เฉพาะเมื่อขอ ?paginate=cursor — เปิดเป็นค่าเริ่มต้นเมื่อ frontend ย้ายครบแล้ว
+API_KEYSET_PAGINATION_DEFAULT = config('API_KEYSET_PAGINATION_DEFAULT', default=False, cast=bool)
+
+# Cache
+# ค่าเริ่มต้นเป็น cache ในหน่วยความจำของแต่ละ worker — รุ่นเนื้อหาอยู่ในฐานข้อมูล
+# จึงล้างได้ถูกต้องทุก worker แม้ไม่มี cache กลาง
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='civicblogs'),
+    }
+}
+
+# Response cache ของ /api/v1 (blog/api_cache.py) — ล้างเองเมื่อเนื้อหาเปลี่ยน
+# timeout เป็นเพดานให้ยอดเข้าชมไม่ค้างนานเกินไป
+API_CACHE_ENABLED = config('API_CACHE_ENABLED', default=True, cast=bool)
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+
+# View counters (blog/view_counter.py)
+# ยอดเข้าชมถูกเก็บใน worker แล้วเขียนเป็นรอบ แทนการเขียนฐานข้อมูลทุกครั้งที่มีคนเปิดอ่าน
+# ตั้ง interval เป็น 0 เพื่อเขียนทันที
+VIEW_COUNT_FLUSH_INTERVAL = config('VIEW_COUNT_FLUSH_INTERVAL', default=30, cast=int)
+VIEW_COUNT_FLUSH_THRESHOLD = config('VIEW_COUNT_FLUSH_THRESHOLD', default=500, cast=int)
+VIEW_COUNT_SPOOL_DIR = config('VIEW_COUNT_SPOOL_DIR', default=str(BASE_DIR / 'var' / 'view_counts'))
+
+# Facebook Graph API (blog/graph_client.py)
+# ชี้ไปที่ blog/graph_fixture.py เพื่อทดสอบหรือวัดความเร็วตัวนำเข้าโดยไม่ต้องต่อ Facebook จริง
+FACEBOOK_GRAPH_URL = config('FACEBOOK_GRAPH_URL', default='https://graph.facebook.com/v21.0/')
+
+# Facebook webhook (blog/webhooks.py -> process_facebook_webhooks)
+# ไม่ตั้ง FACEBOOK_APP_SECRET = ปฏิเสธทุก request เพราะตรวจลายเซ็นไม่ได้
+# RECORD_DIR: เก็บ body ดิบของทุก request ไว้เล่นซ้ำด้วย replay_facebook_webhooks
+FACEBOOK_APP_SECRET = config('FACEBOOK_APP_SECRET', default='')
+FACEBOOK_WEBHOOK_VERIFY_TOKEN = config('FACEBOOK_WEBHOOK_VERIFY_TOKEN', default='')
+FACEBOOK_WEBHOOK_RECORD_DIR = config('FACEBOOK_WEBHOOK_RECORD_DIR', default='')
+
+# ตัวจัด Category ของโพสต์ที่นำเข้า (blog/category_classifier.py)
+# สร้างด้วย manage.py train_category_classifier (--threshold เก็บในไฟล์)
+# ไม่มีไฟล์นี้ตัวนำเข้าใช้ CATEGORY_KEYWORDS
+CATEGORY_MODEL_PATH = config('CATEGORY_MODEL_PATH', default=str(BASE_DIR / 'var' / 'category_model.npz'))
+
+# Cache ผลวิเคราะห์ความรู้สึกของคอมเมนต์ (blog/sentiment_cache.py)
+# ALIAS: ชื่อใน CACHES สำหรับชั้นที่ใช้ร่วมกันทุก worker (เว้นว่าง = หน่วยความจำของ process อย่างเดียว)
+SENTIMENT_CACHE_SIZE = config('SENTIMENT_CACHE_SIZE', default=10000, cast=int)
+SENTIMENT_CACHE_ALIAS = config('SENTIMENT_CACHE_ALIAS', default='')
+SENTIMENT_CACHE_TIMEOUT = config('SENTIMENT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
 # CKEditor Configuration
 CKEDITOR_UPLOAD_PATH = "uploads/"
 CKEDITOR_RESTRICT_BY_USER = True
@@ -35,4 +35,13 @@ tmp_upload_dir = None
 
 # SSL
 keyfile = None
-certfile = None
\ No newline at end of file
+certfile = None
+
+# Server hooks
+def worker_exit(server, worker):
+    # เขียนยอดเข้าชมที่ค้างใน worker ก่อนปิด (ดู blog/view_counter.py)
+    try:
+        from blog.view_counter import flush_view_counts
+        flush_view_counts()
+    except Exception as e:
+        server.log.warning("view count flush on exit failed: %s", e)